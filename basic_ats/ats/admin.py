@@ -1,7 +1,7 @@
 from django.contrib import admin
-from .models import Candidate, Experience
+from .models import BackgroundJob, Candidate
 
 
 # Register your models here.
 admin.site.register(Candidate)
-admin.site.register(Experience)
+admin.site.register(BackgroundJob)
@@ -0,0 +1,270 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication, get_cached_user
+from .cache import get_cached_candidate, invalidate_candidates
+from .dedup import DuplicateCandidate, create_candidate_deduplicated, creation_response, get_dedup_policy
+from .instrumentation import timed
+from .models import Candidate
+from .name_index import fuzzy_rank_candidates_by_name, name_token_matches, score_name_matches
+from .renderers import RenderedJSON, dumps, render_candidate_rows
+from .stats import candidate_facets, get_facet_buckets
+from .utils import (verify_gender, verify_phone_number, verify_email_address, validate_ceate_candidate_request_body,
+                    build_candidate_search_filters, candidate_values, candidate_row_to_json, candidate_page_values,
+                    build_candidate_page, transition_candidates_status, build_candidate_search_options,
+                    search_candidate_values)
+from . import constants
+
+
+_jwt_authentication = CachedJWTAuthentication()
+
+
+async def aauthenticate(request):
+    """
+        This function authenticates a request from its JWT without blocking the event loop.
+        Token decoding and signature checks are CPU only and cached like in CachedJWTAuthentication.
+        A user missing from the cache is loaded and checked by CachedJWTAuthentication.get_user
+        in a worker thread, so the async views refuse the same tokens as the sync views.
+        Args:
+            request: HttpRequest
+        Returns:
+            user: active user, or None when the request is not authenticated
+    """
+    header = _jwt_authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = _jwt_authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        validated_token = _jwt_authentication.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+
+    user = get_cached_user(validated_token)
+    if user is not None:
+        return user
+    try:
+        return await sync_to_async(_jwt_authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def json_response(data, response_status) -> HttpResponse:
+    content = data if isinstance(data, RenderedJSON) else dumps(data)
+    return HttpResponse(content, status=response_status, content_type="application/json")
+
+
+@timed("serialization")
+async def afetch_candidate_rows(candidate_ids) -> dict:
+    """
+        This function fetches response rows for a list of ids in chunked queries with the async ORM
+        Args:
+            candidate_ids: list of candidate ids
+        Returns:
+            rows: dict of id -> candidate response dict
+    """
+    candidate_ids = list(candidate_ids)
+    chunk_size = settings.ATS_ID_CHUNK_SIZE
+    rows = {}
+    for start in range(0, len(candidate_ids), chunk_size):
+        chunk = candidate_ids[start:start + chunk_size]
+        async for row in candidate_values(Candidate.objects.filter(id__in=chunk), "id"):
+            rows[row[-1]] = candidate_row_to_json(row)
+    return rows
+
+
+class AsyncAtsView(View):
+    """
+        Base view that authenticates with JWT before dispatching to async handlers
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await aauthenticate(request)
+        if request.user is None:
+            return json_response({"detail": "Authentication credentials were not provided or are invalid."},
+                                 status.HTTP_401_UNAUTHORIZED)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def load_body(self, request):
+        return json.loads(request.body or b"{}")
+
+
+class AsyncCreateCandidateApi(AsyncAtsView):
+    """
+        Create, get and update candidate
+    """
+    async def get(self, request, pk):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            candidates = Candidate.objects.filter(id=pk)
+            # same cache entry as the sync view, the cache backend and the loader are synchronous
+            res = await sync_to_async(get_cached_candidate)(
+                pk, lambda: render_candidate_rows(candidate_values(candidates)))
+            response_status = status.HTTP_200_OK
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+
+        return json_response(res, response_status)
+
+    async def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            data = self.load_body(request)
+
+            validation_status, error = validate_ceate_candidate_request_body(data)
+            if validation_status:
+                gender = verify_gender(data["gender"])
+                phone_number = verify_phone_number(data["phone_number"])
+                email = verify_email_address(data["email"])
+                policy = get_dedup_policy(request.GET.get("dedup_policy"))
+                candidate_id, created = await sync_to_async(create_candidate_deduplicated)(dict(
+                    name=data["name"], age=data["age"], gender=gender, phone_number=phone_number, email=email,
+                    years_of_exp=data["years_of_exp"], current_salary=data["current_salary"],
+                    expected_salary=data["expected_salary"]), policy)
+                # cache writes are synchronous, a database cache backend cannot run in the event loop
+                res = await sync_to_async(creation_response)(candidate_id, created, policy)
+                response_status = status.HTTP_200_OK
+            else:
+                res = {
+                    "error": error,
+                    "message": constants.INCORRECT_PAYLOAD
+                }
+        except DuplicateCandidate as e:
+            res = {
+                "error": str(e),
+                "id": e.candidate_id,
+                "message": constants.DUPLICATE_CANDIDATE_REJECTED
+            }
+            response_status = status.HTTP_409_CONFLICT
+        except KeyError as e:
+            res = {
+                "error": str(e),
+                "message": constants.MISSING_KEYS_ERROR
+            }
+        except TypeError as e:
+            res = {
+                "error": str(e),
+                "message": constants.INCORRECT_DATATYPE_ERROR
+            }
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+
+        return json_response(res, response_status)
+
+    async def put(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            data = self.load_body(request)
+            current_status = data["status"]
+            # the conditional UPDATE runs in a transaction, which the async ORM does not offer yet
+            result = await sync_to_async(transition_candidates_status)([data["id"]], current_status,
+                                                                       data.get("reason", ""))
+            if result["transitioned"]:
+                await sync_to_async(invalidate_candidates)(result["transitioned"])
+                res = {
+                    "id": data["id"],
+                    "status": result["status"],
+                    "message": constants.STATUS_UPDATION_SUCCESSFUL
+                }
+                response_status = status.HTTP_200_OK
+            elif result["already_final"]:
+                res = {
+                    "id": data["id"],
+                    "status": current_status,
+                    "error": f"Status cannot be updated. Candidate is already {result['already_final'][data['id']]}",
+                    "message": constants.STATUS_UPDATION_FAILURE
+                }
+            else:
+                res = {
+                    "id": data["id"],
+                    "status": current_status,
+                    "error": "Candidate with given id does not exists",
+                    "message": constants.STATUS_UPDATION_FAILURE
+                }
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.STATUS_UPDATION_FAILURE
+            }
+
+        return json_response(res, response_status)
+
+
+class AsyncSearchCandidate(AsyncAtsView):
+    """
+        Search candidate by its details
+    """
+    async def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+        try:
+            data = self.load_body(request)
+
+            filters = build_candidate_search_filters(data)
+            options = build_candidate_search_options(data)
+            facet_buckets = get_facet_buckets(data)
+            candidates = Candidate.objects.filter(**filters)
+
+            if data.get("paginate") or data.get("cursor") or data.get("page_size"):
+                rows, page_size = candidate_page_values(candidates, data.get("cursor"), data.get("page_size"),
+                                                        options["fields"])
+                res = build_candidate_page([row async for row in rows], page_size, options["fields"])
+            else:
+                res = [candidate_row_to_json(row, options["fields"])
+                       async for row in search_candidate_values(candidates, **options)]
+            if facet_buckets is not None:
+                facets = await sync_to_async(candidate_facets)(candidates, **facet_buckets)
+                res = dict(res, facets=facets) if isinstance(res, dict) else {"results": res, "facets": facets}
+            response_status = status.HTTP_200_OK
+
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+        return json_response(res, response_status)
+
+
+class AsyncSearchByName(AsyncAtsView):
+    """
+        Search candidate by name
+    """
+    async def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            data = self.load_body(request)
+            query = data["name"]
+            if not query:
+                return json_response([], status.HTTP_200_OK)
+
+            if data.get("fuzzy"):
+                # same ranking as the sync view, its two queries run in a worker thread
+                ranked = await sync_to_async(fuzzy_rank_candidates_by_name)(query, data.get("threshold"),
+                                                                            data.get("top_k"))
+            else:
+                ranked = score_name_matches(query, [row async for row in name_token_matches(query)])
+            rows = await afetch_candidate_rows(candidate_id for candidate_id, _ in ranked)
+            res = [rows[candidate_id] for candidate_id, _ in ranked if candidate_id in rows]
+            response_status = status.HTTP_200_OK
+
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+
+        return json_response(res, response_status)
@@ -0,0 +1,144 @@
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class TTLCache:
+    """
+        A thread safe LRU of at most maxsize entries, each with its own expiry time (epoch seconds)
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: float) -> None:
+        if self.maxsize <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# raw token -> validated token, and user id -> user, shared by every CachedJWTAuthentication of the process
+token_cache = TTLCache(settings.ATS_AUTH_CACHE_SIZE)
+user_cache = TTLCache(settings.ATS_AUTH_CACHE_SIZE)
+
+
+def cache_expiry(validated_token=None) -> float:
+    """
+        This function returns when a cache entry expires: after ATS_AUTH_CACHE_TTL_SECONDS,
+        and never after the exp claim of the token it was resolved from
+        Args:
+            validated_token: simplejwt Token, None for no exp bound
+        Returns:
+            expires_at: epoch seconds
+    """
+    expires_at = time.time() + settings.ATS_AUTH_CACHE_TTL_SECONDS
+    if validated_token is not None and "exp" in validated_token:
+        expires_at = min(expires_at, validated_token["exp"])
+    return expires_at
+
+
+def invalidate_user(user_id) -> None:
+    """
+        This function drops a cached user, so the next request of a deactivated user (or one whose
+        password changed) is checked against the database again.
+        Only the caches of the current process are cleared, other processes catch up within
+        ATS_AUTH_CACHE_TTL_SECONDS.
+        Args:
+            user_id: value of the USER_ID_FIELD of the user
+    """
+    user_cache.delete(str(user_id))
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "tokens": {"size": len(token_cache), **token_cache.stats},
+        "users": {"size": len(user_cache), **user_cache.stats},
+    }
+
+
+def get_cached_user(validated_token):
+    """
+        This function returns the cached user of a validated token
+        Args:
+            validated_token: simplejwt Token
+        Returns:
+            user: a copy of the cached user, or None when it has to be loaded
+    """
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+    user = None if user_id is None else user_cache.get(str(user_id))
+    if user is None:
+        return None
+    if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)):
+        # the loading path raises the usual error
+        return None
+    # requests must not share one instance, views may cache attributes on it
+    return copy.copy(user)
+
+
+def cache_user(validated_token, user) -> None:
+    """
+        This function caches the active user a validated token resolved to
+        Args:
+            validated_token: simplejwt Token
+            user: user loaded and checked by simplejwt
+    """
+    user_cache.set(str(validated_token[api_settings.USER_ID_CLAIM]), copy.copy(user), cache_expiry(validated_token))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+        JWTAuthentication that caches verified tokens and the users they resolve to, so a repeated
+        token skips the signature check and the auth_user query.
+        Entries live ATS_AUTH_CACHE_TTL_SECONDS at most and never past the token's exp.
+        A cached token is not checked against a token blacklist again before it expires.
+    """
+    def get_validated_token(self, raw_token: bytes):
+        validated_token = token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, validated_token, cache_expiry(validated_token))
+        return validated_token
+
+    def get_user(self, validated_token):
+        user = get_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(validated_token, user)
+        return user
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import threading
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from .routers import reads_from_replica
+from .snapshot import mark_candidate_snapshot_stale
+
+
+CANDIDATE = "candidate"
+SEARCH = "search"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.ATS_CACHE_ALIAS]
+
+
+def _version_key(scope: str) -> str:
+    return f"ats:version:{scope}"
+
+
+def get_version(scope: str) -> str:
+    """
+        This function returns the current version stamp of a cache scope.
+        Stamps are random, so a version key lost to eviction never matches old entries.
+        Args:
+            scope: "search" or "candidate:<id>"
+        Returns:
+            version: str
+    """
+    cache = get_cache()
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope: str) -> None:
+    """
+        This function invalidates every entry stamped with the current version of a scope
+        Args:
+            scope: "search" or "candidate:<id>"
+    """
+    get_cache().set(_version_key(scope), uuid.uuid4().hex, timeout=None)
+
+
+def _record(kind: str, hit: bool) -> None:
+    with _stats_lock:
+        _stats[f"{kind}_{'hits' if hit else 'misses'}"] += 1
+
+
+def cache_stats() -> dict:
+    """
+        This function returns hit and miss counters of this process
+        Returns:
+            stats: dict of counter name -> count
+    """
+    with _stats_lock:
+        stats = {f"{kind}_{outcome}": 0 for kind in (CANDIDATE, SEARCH) for outcome in ("hits", "misses")}
+        stats.update(_stats)
+    return stats
+
+
+def reset_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _get_or_load(kind: str, scope: str, key: str, loader, timeout=None, cacheable=None):
+    """
+        This function returns a cached value whose stamp matches the scope version, or loads and stores it.
+        The version is read before loading, so a write that lands during the load
+        leaves the stored entry stale rather than serving it.
+        A loaded value is only stored when cacheable is None or cacheable(value) is true.
+        Values loaded from a read replica are never stored: the replica may not have the write that
+        bumped the version yet, and the entry would be served to every client, the writer included.
+    """
+    cache = get_cache()
+    version = get_version(scope)
+    entry = cache.get(key)
+    if entry is not None and entry["version"] == version:
+        _record(kind, True)
+        return entry["value"]
+
+    _record(kind, False)
+    value = loader()
+    if reads_from_replica() or (cacheable is not None and not cacheable(value)):
+        return value
+    if timeout is None:
+        timeout = settings.ATS_CACHE_TIMEOUT
+    cache.set(key, {"version": version, "value": value}, timeout=timeout)
+    return value
+
+
+def canonical_hash(data: dict) -> str:
+    """
+        This function hashes a dict independently of key order
+        Args:
+            data: JSON-like dict
+        Returns:
+            digest: hex sha256
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_cached_candidate(pk: int, loader):
+    """
+        This function returns the cached response of a single candidate lookup.
+        Lookups of missing ids are not cached: creates only invalidate searches,
+        so a cached empty response would hide the candidate once it is created.
+        Args:
+            pk: candidate id
+            loader: callable building the response on a miss
+        Returns:
+            response data
+    """
+    return _get_or_load(CANDIDATE, f"{CANDIDATE}:{pk}", f"ats:{CANDIDATE}:{pk}", loader,
+                        cacheable=lambda value: value not in (b"[]", []))
+
+
+def get_cached_search(filters: dict, loader, timeout=None):
+    """
+        This function returns the cached response of a search
+        Args:
+            filters: dict identifying the search, hashed canonically
+            loader: callable building the response on a miss
+            timeout: seconds to keep the entry, ATS_CACHE_TIMEOUT when None
+        Returns:
+            response data
+    """
+    return _get_or_load(SEARCH, SEARCH, f"ats:{SEARCH}:{canonical_hash(filters)}", loader, timeout)
+
+
+def invalidate_candidates(candidate_ids=()) -> None:
+    """
+        This function invalidates cached searches and the given candidates after a write.
+        The candidate snapshot of this process is refreshed on its next use.
+        Args:
+            candidate_ids: ids of updated candidates, empty for pure inserts
+    """
+    mark_candidate_snapshot_stale()
+    for pk in candidate_ids:
+        bump_version(f"{CANDIDATE}:{pk}")
+    bump_version(SEARCH)
@@ -5,3 +5,9 @@ STATUS_UPDATION_FAILURE = "Status not updated"
 MISSING_KEYS_ERROR = "Required keys are missing"
 INCORRECT_DATATYPE_ERROR = "Required values data type are incorrect"
 DEFAULT_ERROR_MESSAGE = "Some error occured while executing process"
+BULK_IMPORT_COMPLETED = "Bulk import completed"
+DUPLICATE_CANDIDATE_EXISTS = "Candidate already exists"
+DUPLICATE_CANDIDATE_MERGED = "Candidate already exists, details merged"
+DUPLICATE_CANDIDATE_REJECTED = "Duplicate candidate rejected"
+JOB_QUEUED = "Job queued"
+JOB_NOT_FOUND = "Job not found"
@@ -0,0 +1,49 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.db import connections
+
+
+def apply_sqlite_pragmas(connection, pragmas: dict = None) -> None:
+    """
+        This function runs the configured PRAGMA statements on a new SQLite connection
+        Args:
+            connection: Django database connection
+            pragmas: dict of pragma -> value, ATS_SQLITE_PRAGMAS when None
+    """
+    if connection.vendor != "sqlite":
+        return
+    if pragmas is None:
+        pragmas = settings.ATS_SQLITE_PRAGMAS
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def refresh_sqlite_replica(alias: str, source_alias: str = "default", pages: int = -1) -> float:
+    """
+        This function copies a SQLite database onto a replica with the online backup API.
+        The primary stays writable during the copy; with pages > 0 the copy is made in steps,
+        releasing the primary's read lock in between.
+        Args:
+            alias: DATABASES alias of the replica
+            source_alias: DATABASES alias of the primary
+            pages: pages copied per step, -1 copies everything in one step
+        Returns:
+            seconds: duration of the copy
+    """
+    if alias == source_alias:
+        raise ValueError(f"{alias} cannot be refreshed from itself.")
+    source_settings = connections[source_alias].settings_dict
+    target_settings = connections[alias].settings_dict
+    if source_settings["ENGINE"] != "django.db.backends.sqlite3" or target_settings["ENGINE"] != source_settings["ENGINE"]:
+        raise ValueError("Only SQLite databases can be refreshed with the backup API.")
+    start = time.perf_counter()
+    source = sqlite3.connect(source_settings["NAME"])
+    target = sqlite3.connect(target_settings["NAME"])
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+    return time.perf_counter() - start
@@ -0,0 +1,160 @@
+import hashlib
+import re
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .cache import invalidate_candidates
+from .models import Candidate
+from .name_index import sync_candidate_name_index
+from . import constants
+
+
+DEDUP_REJECT = "reject"
+DEDUP_MERGE = "merge"
+DEDUP_RETURN_EXISTING = "return_existing"
+DEDUP_POLICIES = (DEDUP_REJECT, DEDUP_MERGE, DEDUP_RETURN_EXISTING)
+
+# profile fields a later application overwrites on merge, status and reason are kept
+MERGE_FIELDS = ("name", "age", "gender", "years_of_exp", "current_salary", "expected_salary")
+
+NON_DIGITS = re.compile(r"\D")
+
+
+class DuplicateCandidate(Exception):
+    def __init__(self, candidate_id: int):
+        super().__init__(f"Candidate {candidate_id} has the same email and phone number.")
+        self.candidate_id = candidate_id
+
+
+def candidate_dedup_key(email: str, phone_number) -> str:
+    """
+        This function builds the dedup key of a candidate from its normalized email and phone number
+        Args:
+            email: email
+            phone_number: phone number, str or int
+        Returns:
+            key: hex sha1 of "email|digits"
+    """
+    normalized = f"{str(email).strip().lower()}|{NON_DIGITS.sub('', str(phone_number))}"
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def get_dedup_policy(policy: str = None) -> str:
+    """
+        This function verifies a dedup policy
+        Args:
+            policy: requested policy, None for ATS_DEDUP_POLICY
+        Returns:
+            policy: one of DEDUP_POLICIES
+    """
+    policy = policy or settings.ATS_DEDUP_POLICY
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"{policy} is an invalid dedup policy. Add from choices {list(DEDUP_POLICIES)}")
+    return policy
+
+
+def existing_dedup_keys(keys) -> dict:
+    """
+        This function looks up which dedup keys are already taken, in chunked queries
+        Args:
+            keys: iterable of dedup keys
+        Returns:
+            existing: dict of dedup key -> candidate id
+    """
+    keys = list(set(keys))
+    chunk_size = settings.ATS_ID_CHUNK_SIZE
+    existing = {}
+    for start in range(0, len(keys), chunk_size):
+        existing.update(Candidate.objects.filter(dedup_key__in=keys[start:start + chunk_size])
+                        .values_list("dedup_key", "id"))
+    return existing
+
+
+def merge_candidates(updates: dict, fields=MERGE_FIELDS) -> list:
+    """
+        This function copies the fields of later applications onto existing candidates
+        with one bulk UPDATE, and re-indexes renamed candidates
+        Args:
+            updates: dict of candidate id -> dict of new field values
+            fields: fields that may be copied, MERGE_FIELDS by default
+        Returns:
+            candidates: merged Candidate objects
+    """
+    candidates = list(Candidate.objects.filter(id__in=list(updates)))
+    changed_fields = set()
+    renamed = []
+    now = timezone.now()
+    for candidate in candidates:
+        data = updates[candidate.id]
+        changed = [field for field in fields if field in data and getattr(candidate, field) != data[field]]
+        for field in changed:
+            setattr(candidate, field, data[field])
+        if changed:
+            candidate.updated_at = now
+        changed_fields.update(changed)
+        if "name" in changed:
+            renamed.append(candidate)
+    if changed_fields:
+        Candidate.objects.bulk_update(candidates, [*changed_fields, "updated_at"])
+    if renamed:
+        sync_candidate_name_index(renamed)
+    return candidates
+
+
+def resolve_duplicate(candidate_id: int, data: dict, policy: str) -> int:
+    """
+        This function applies a dedup policy to an application matching an existing candidate
+        Args:
+            candidate_id: id of the existing candidate
+            data: validated candidate payload
+            policy: one of DEDUP_POLICIES
+        Returns:
+            candidate_id: id of the existing candidate
+    """
+    if policy == DEDUP_REJECT:
+        raise DuplicateCandidate(candidate_id)
+    if policy == DEDUP_MERGE:
+        merge_candidates({candidate_id: data})
+    return candidate_id
+
+
+def create_candidate_deduplicated(fields: dict, policy: str = None) -> tuple:
+    """
+        This function creates a candidate unless one with the same dedup key exists.
+        The unique index settles concurrent inserts of the same person.
+        Args:
+            fields: Candidate field values, email and phone number included
+            policy: one of DEDUP_POLICIES, None for ATS_DEDUP_POLICY
+        Returns:
+            (candidate_id, created)
+    """
+    policy = get_dedup_policy(policy)
+    key = candidate_dedup_key(fields["email"], fields["phone_number"])
+    candidate_id = Candidate.objects.filter(dedup_key=key).values_list("id", flat=True).first()
+    if candidate_id is None:
+        try:
+            with transaction.atomic():
+                return Candidate.objects.create(dedup_key=key, **fields).id, True
+        except IntegrityError:
+            # inserted by another request since the lookup
+            candidate_id = Candidate.objects.get(dedup_key=key).id
+    return resolve_duplicate(candidate_id, fields, policy), False
+
+
+def creation_response(candidate_id: int, created: bool, policy: str) -> dict:
+    """
+        This function builds the create response and invalidates cached reads
+        Args:
+            candidate_id: id of the new or existing candidate
+            created: False when the candidate already existed
+            policy: dedup policy applied to an existing candidate
+        Returns:
+            res: response dict
+    """
+    if created:
+        invalidate_candidates()
+        return {"id": candidate_id, "message": constants.SUCCESSFUL_CREATION}
+    if policy == DEDUP_MERGE:
+        invalidate_candidates([candidate_id])
+        return {"id": candidate_id, "message": constants.DUPLICATE_CANDIDATE_MERGED}
+    return {"id": candidate_id, "message": constants.DUPLICATE_CANDIDATE_EXISTS}
@@ -0,0 +1,160 @@
+import csv
+import io
+import zlib
+from django.conf import settings
+from .instrumentation import timed
+from .renderers import dumps
+from .utils import CANDIDATE_RESPONSE_KEYS, candidate_row_to_json, search_candidate_values
+
+
+CSV_FORMAT = "csv"
+NDJSON_FORMAT = "ndjson"
+EXPORT_CONTENT_TYPES = {
+    CSV_FORMAT: "text/csv; charset=utf-8",
+    NDJSON_FORMAT: "application/x-ndjson",
+}
+GZIP_CONTENT_TYPE = "application/gzip"
+
+# bytes collected before a chunk is handed to the response, so the server is not
+# called once per row
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def get_export_format(export_format: str = None) -> str:
+    """
+        This function verifies the requested export format
+        Args:
+            export_format: one of EXPORT_CONTENT_TYPES, None for csv
+        Returns:
+            export_format: str
+    """
+    export_format = export_format or CSV_FORMAT
+    if export_format not in EXPORT_CONTENT_TYPES:
+        raise ValueError(f"{export_format} is an invalid format. Add from choices {list(EXPORT_CONTENT_TYPES)}")
+    return export_format
+
+
+def escape_csv_cell(value):
+    """
+        This function neutralizes applicant supplied text that a spreadsheet would run as a formula,
+        by prefixing it with a quote
+        Args:
+            value: cell value
+        Returns:
+            value: the value, quoted when it is a string starting with a FORMULA_PREFIXES character
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+@timed("serialization")
+def csv_chunks(rows, fields=CANDIDATE_RESPONSE_KEYS):
+    """
+        This function yields rows as CSV, header first. Text cells are escaped with escape_csv_cell.
+        Args:
+            rows: iterable of response tuples
+            fields: response keys the rows were selected with
+        Returns:
+            generator of bytes
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([escape_csv_cell(value) for value in row])
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+@timed("serialization")
+def ndjson_chunks(rows, fields=CANDIDATE_RESPONSE_KEYS):
+    """
+        This function yields rows as newline delimited JSON objects
+        Args:
+            rows: iterable of response tuples
+            fields: response keys the rows were selected with
+        Returns:
+            generator of bytes
+    """
+    buffer = bytearray()
+    for row in rows:
+        buffer += dumps(candidate_row_to_json(row, fields))
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzip_chunks(chunks, level: int = None):
+    """
+        This function gzips a byte stream on the fly
+        Args:
+            chunks: iterable of bytes
+            level: compression level, ATS_EXPORT_GZIP_LEVEL by default
+        Returns:
+            generator of gzip bytes
+    """
+    level = settings.ATS_EXPORT_GZIP_LEVEL if level is None else level
+    # wbits 16 + MAX_WBITS writes a gzip header and trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def report_rows(rows, every: int, progress):
+    """
+        This function yields rows and reports how many were yielded every so many rows and at the end
+        Args:
+            rows: iterable
+            every: rows between reports
+            progress: callable receiving the number of rows yielded so far
+        Returns:
+            generator of the rows
+    """
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            progress(count)
+    progress(count)
+
+
+def export_candidates(candidates, export_format: str = CSV_FORMAT, gzip: bool = False, chunk_size: int = None,
+                      fields=CANDIDATE_RESPONSE_KEYS, ordering=(), limit=None, progress=None):
+    """
+        This function streams a candidate search as CSV or NDJSON.
+        Rows are pulled with a server-side chunked iterator, so memory does not grow with the export.
+        Args:
+            candidates: filtered Candidate queryset
+            export_format: one of EXPORT_CONTENT_TYPES
+            gzip: compress the stream
+            chunk_size: rows fetched per database round trip, ATS_SEARCH_STREAM_CHUNK_SIZE by default
+            fields, ordering, limit: see search_candidate_values
+            progress: optional callable receiving the number of rows exported, once per chunk
+        Returns:
+            generator of bytes
+    """
+    chunk_size = chunk_size or settings.ATS_SEARCH_STREAM_CHUNK_SIZE
+    rows = search_candidate_values(candidates, fields, ordering, limit).iterator(chunk_size=chunk_size)
+    if progress is not None:
+        rows = report_rows(rows, chunk_size, progress)
+    writer = csv_chunks if get_export_format(export_format) == CSV_FORMAT else ndjson_chunks
+    chunks = writer(rows, fields)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_filename(export_format: str, gzip: bool = False) -> str:
+    return f"candidates.{export_format}" + (".gz" if gzip else "")
@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from .dedup import DEDUP_MERGE, DEDUP_REJECT, DuplicateCandidate, candidate_dedup_key, existing_dedup_keys
+from .dedup import get_dedup_policy, merge_candidates
+from .models import Candidate
+from .name_index import sync_candidate_name_index
+from .utils import verify_gender, verify_phone_number, verify_email_address, validate_ceate_candidate_request_body
+
+
+JSON_FORMAT = "json"
+NDJSON_FORMAT = "ndjson"
+CSV_FORMAT = "csv"
+IMPORT_FORMATS = (JSON_FORMAT, NDJSON_FORMAT, CSV_FORMAT)
+
+CONTENT_TYPE_FORMATS = {
+    "application/json": JSON_FORMAT,
+    "application/x-ndjson": NDJSON_FORMAT,
+    "text/csv": CSV_FORMAT,
+}
+
+# CSV cells arrive as strings, the create schema expects numbers
+CSV_NUMBER_COLUMNS = ("years_of_exp", "current_salary", "expected_salary", "phone_number")
+CSV_INTEGER_COLUMNS = ("age",)
+
+
+def parse_csv_row(row: dict) -> dict:
+    """
+        This function converts numeric CSV cells and drops empty ones
+        Args:
+            row: dict from csv.DictReader
+        Returns:
+            row: candidate payload
+    """
+    data = {key: value for key, value in row.items() if key and value not in (None, "")}
+    for key in CSV_INTEGER_COLUMNS:
+        if key in data:
+            data[key] = int(data[key])
+    for key in CSV_NUMBER_COLUMNS:
+        if key in data:
+            value = float(data[key])
+            data[key] = int(value) if value.is_integer() else value
+    return data
+
+
+def read_candidate_rows(lines, import_format: str):
+    """
+        This function yields candidate payloads from a JSON array, NDJSON or CSV source.
+        NDJSON and CSV are read lazily line by line.
+        Args:
+            lines: iterable of str lines (an open text file works)
+            import_format: one of IMPORT_FORMATS
+        Returns:
+            generator of dict, or of an Exception for a row that could not be parsed
+    """
+    if import_format == JSON_FORMAT:
+        rows = json.loads("".join(lines))
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of candidates.")
+        yield from rows
+    elif import_format == NDJSON_FORMAT:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as err:
+                yield err
+    elif import_format == CSV_FORMAT:
+        for row in csv.DictReader(lines):
+            try:
+                yield parse_csv_row(row)
+            except ValueError as err:
+                yield err
+    else:
+        raise ValueError(f"{import_format} is an invalid format. Add from choices {list(IMPORT_FORMATS)}")
+
+
+def read_candidate_body(body: bytes, content_type: str):
+    """
+        This function yields candidate payloads from a raw request body
+        Args:
+            body: request body
+            content_type: request content type
+        Returns:
+            generator of dict
+    """
+    import_format = CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip())
+    if import_format is None:
+        raise ValueError(f"{content_type} is not supported. Use one of {list(CONTENT_TYPE_FORMATS)}")
+    return read_candidate_rows(io.StringIO(body.decode()), import_format)
+
+
+def clean_candidate_row(data) -> dict:
+    """
+        This function validates one candidate payload
+        Args:
+            data: candidate payload
+        Returns:
+            data: payload with normalised gender, phone number and email
+    """
+    if isinstance(data, Exception):
+        raise data
+    if not isinstance(data, dict):
+        raise ValueError("Candidate must be an object.")
+    validation_status, error = validate_ceate_candidate_request_body(data)
+    if not validation_status:
+        raise ValueError(error)
+    data = dict(data)
+    data["gender"] = verify_gender(data["gender"])
+    data["phone_number"] = verify_phone_number(data["phone_number"])
+    data["email"] = verify_email_address(data["email"])
+    return data
+
+
+def insert_candidate_batch(batch: list, index_names: bool = True) -> list:
+    """
+        This function inserts validated candidates with one bulk INSERT per table
+        Args:
+            batch: list of validated candidate payloads
+            index_names: False to skip the name search indexes, e.g. for benchmark data
+        Returns:
+            candidates: created Candidate objects in input order
+    """
+    with transaction.atomic():
+        candidates = Candidate.objects.bulk_create([
+            Candidate(name=data["name"], age=data["age"], gender=data["gender"],
+                      phone_number=data["phone_number"], email=data["email"],
+                      years_of_exp=data["years_of_exp"], current_salary=data["current_salary"],
+                      expected_salary=data["expected_salary"], dedup_key=data.get("dedup_key"))
+            for data in batch
+        ])
+        if index_names:
+            sync_candidate_name_index(candidates, replace=False)
+    return candidates
+
+
+def split_duplicate_rows(indexes: list, rows: list) -> tuple:
+    """
+        This function keys validated rows and separates the rows of people already in the
+        table, or already earlier in the same chunk, with one lookup per ATS_ID_CHUNK_SIZE keys
+        Args:
+            indexes: row indexes
+            rows: validated candidate payloads
+        Returns:
+            (new_indexes, new_rows, duplicates as (index, key, row) tuples, existing dict of key -> id)
+    """
+    keys = [candidate_dedup_key(data["email"], data["phone_number"]) for data in rows]
+    existing = existing_dedup_keys(keys)
+    new_indexes, new_rows, duplicates = [], [], []
+    seen = set()
+    for index, data, key in zip(indexes, rows, keys):
+        if key in existing or key in seen:
+            duplicates.append((index, key, data))
+        else:
+            seen.add(key)
+            new_indexes.append(index)
+            new_rows.append(dict(data, dedup_key=key))
+    return new_indexes, new_rows, duplicates, existing
+
+
+def import_candidate_chunk(chunk: list, policy: str, result: dict) -> None:
+    """
+        This function validates, deduplicates and inserts one chunk of rows in place of result
+        Args:
+            chunk: list of (index, payload)
+            policy: one of DEDUP_POLICIES
+            result: import_candidates result, updated
+    """
+    valid_indexes = []
+    valid_rows = []
+    for index, data in chunk:
+        try:
+            valid_rows.append(clean_candidate_row(data))
+            valid_indexes.append(index)
+        except (ValueError, KeyError, TypeError) as err:
+            result["errors"].append({"index": index, "error": str(err)})
+
+    if not valid_rows:
+        return
+    valid_indexes, valid_rows, duplicates, existing = split_duplicate_rows(valid_indexes, valid_rows)
+    if valid_rows:
+        try:
+            candidates = insert_candidate_batch(valid_rows)
+        except Exception as err:
+            failed = valid_indexes + [index for index, _, _ in duplicates]
+            result["errors"].extend({"index": index, "error": str(err)} for index in failed)
+            return
+        result["ids"].extend(a_candidate.id for a_candidate in candidates)
+        result["created"] += len(candidates)
+        existing.update((a_candidate.dedup_key, a_candidate.id) for a_candidate in candidates)
+
+    merges = {}
+    for index, key, data in duplicates:
+        if policy == DEDUP_REJECT:
+            result["errors"].append({"index": index, "error": str(DuplicateCandidate(existing[key]))})
+            continue
+        result["duplicates"].append({"index": index, "id": existing[key]})
+        if policy == DEDUP_MERGE:
+            # later rows of the same person win
+            merges.setdefault(existing[key], {}).update(data)
+    if merges:
+        merge_candidates(merges)
+        result["merged"] += len(merges)
+
+
+def import_candidates(rows, batch_size: int = None, policy: str = None, progress=None) -> dict:
+    """
+        This function validates and inserts candidates in chunked transactions.
+        Invalid rows are reported and skipped, a failed chunk does not stop the import.
+        Rows matching an existing candidate are handled by the dedup policy: reported as
+        errors (reject), or listed under duplicates with the existing id (return_existing, merge).
+        Args:
+            rows: iterable of candidate payloads
+            batch_size: rows validated and inserted per transaction
+            policy: one of DEDUP_POLICIES, None for ATS_DEDUP_POLICY
+            progress: optional callable receiving the number of rows processed after each chunk
+        Returns:
+            result: dict with created ids, duplicates and per-row errors, rows are 0-indexed
+    """
+    batch_size = batch_size or settings.ATS_IMPORT_BATCH_SIZE
+    policy = get_dedup_policy(policy)
+    result = {"created": 0, "ids": [], "duplicates": [], "merged": 0, "errors": []}
+    rows = enumerate(rows)
+    processed = 0
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return result
+        import_candidate_chunk(chunk, policy, result)
+        processed += len(chunk)
+        if progress is not None:
+            progress(processed)
@@ -0,0 +1,195 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# route of the request being served, used to label phase timers
+current_endpoint = contextvars.ContextVar("ats_current_endpoint", default="none")
+
+
+class RequestStats:
+    """
+        SQL counters of one request, filled by the execute wrapper
+    """
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+class MetricsRegistry:
+    """
+        Process-wide request and phase metrics, rendered in Prometheus text format
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.request_seconds = defaultdict(float)
+            self.request_buckets = defaultdict(lambda: [0] * len(REQUEST_DURATION_BUCKETS))
+            self.sql_queries = defaultdict(int)
+            self.sql_seconds = defaultdict(float)
+            self.phase_calls = defaultdict(int)
+            self.phase_seconds = defaultdict(float)
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        endpoint = (method, route)
+        with self.lock:
+            self.requests[(method, route, str(status_code))] += 1
+            self.request_seconds[endpoint] += seconds
+            buckets = self.request_buckets[endpoint]
+            for index, bound in enumerate(REQUEST_DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self.sql_queries[endpoint] += stats.sql_count
+            self.sql_seconds[endpoint] += stats.sql_seconds
+
+    def observe_phase(self, phase: str, seconds: float, endpoint: str = None) -> None:
+        key = (endpoint or current_endpoint.get(), phase)
+        with self.lock:
+            self.phase_calls[key] += 1
+            self.phase_seconds[key] += seconds
+
+    def render(self) -> str:
+        """
+            This function renders every metric in the Prometheus text exposition format
+            Returns:
+                text: str
+        """
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{escape(val)}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        with self.lock:
+            family("ats_requests_total", "counter", "Requests served.",
+                   [((("method", m), ("route", r), ("status", s)), count)
+                    for (m, r, s), count in sorted(self.requests.items())])
+
+            histogram = []
+            for (m, r), buckets in sorted(self.request_buckets.items()):
+                labels = (("method", m), ("route", r))
+                for bound, count in zip(REQUEST_DURATION_BUCKETS, buckets):
+                    histogram.append((labels + (("le", str(bound)),), count))
+                total = sum(count for (method, route, _), count in self.requests.items() if (method, route) == (m, r))
+                histogram.append((labels + (("le", "+Inf"),), total))
+            lines.append("# HELP ats_request_duration_seconds Wall time per request.")
+            lines.append("# TYPE ats_request_duration_seconds histogram")
+            for labels, value in histogram:
+                label_text = ",".join(f'{key}="{escape(val)}"' for key, val in labels)
+                lines.append(f"ats_request_duration_seconds_bucket{{{label_text}}} {value}")
+            for (m, r), seconds in sorted(self.request_seconds.items()):
+                label_text = f'method="{escape(m)}",route="{escape(r)}"'
+                total = sum(count for (method, route, _), count in self.requests.items() if (method, route) == (m, r))
+                lines.append(f"ats_request_duration_seconds_sum{{{label_text}}} {seconds}")
+                lines.append(f"ats_request_duration_seconds_count{{{label_text}}} {total}")
+
+            family("ats_request_sql_queries_total", "counter", "SQL queries executed while serving requests.",
+                   [((("method", m), ("route", r)), count) for (m, r), count in sorted(self.sql_queries.items())])
+            family("ats_request_sql_seconds_total", "counter", "Time spent in SQL while serving requests.",
+                   [((("method", m), ("route", r)), seconds) for (m, r), seconds in sorted(self.sql_seconds.items())])
+            family("ats_phase_calls_total", "counter", "Calls of instrumented hot-path phases.",
+                   [((("endpoint", e), ("phase", p)), count) for (e, p), count in sorted(self.phase_calls.items())])
+            family("ats_phase_seconds_total", "counter", "Time spent in instrumented hot-path phases.",
+                   [((("endpoint", e), ("phase", p)), seconds)
+                    for (e, p), seconds in sorted(self.phase_seconds.items())])
+
+        return "\n".join(lines) + "\n"
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def phase_timer(phase: str):
+    """
+        This context manager records the wall time of a block as a phase of the current endpoint
+        Args:
+            phase: phase name, e.g. "validation"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe_phase(phase, time.perf_counter() - start)
+
+
+def timed(phase: str):
+    """
+        This decorator records every call of a function as a phase of the current endpoint.
+        For generator functions the time spent producing all items counts as one call, and is
+        labelled with the endpoint that created the generator, since responses are streamed
+        after the view returned. Coroutine functions are timed until they return.
+        Args:
+            phase: phase name, e.g. "serialization"
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                return timed_items(phase, func(*args, **kwargs), current_endpoint.get())
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args, **kwargs):
+                with phase_timer(phase):
+                    return await func(*args, **kwargs)
+            return coroutine_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase_timer(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_items(phase: str, items, endpoint: str):
+    """
+        This function yields the items of an iterator and records the time spent producing them,
+        once the iterator is exhausted or closed
+        Args:
+            phase: phase name
+            items: iterator
+            endpoint: endpoint label of the phase
+        Returns:
+            generator of the items
+    """
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        registry.observe_phase(phase, seconds, endpoint)
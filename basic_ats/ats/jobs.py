@@ -0,0 +1,236 @@
+import os
+import socket
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .cache import invalidate_candidates
+from .export import export_candidates, export_filename, get_export_format
+from .importer import import_candidates, read_candidate_body
+from .models import BackgroundJob, BackgroundJobState, Candidate
+from .name_index import rebuild_candidate_name_index
+from .utils import build_candidate_search_filters, build_candidate_search_options
+
+
+# job kind -> handler(payload, progress) returning a JSON-able result
+JOB_HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """
+        This decorator registers a function as the handler of a job kind.
+        Handlers receive the job payload and a progress callable taking a 0-1 fraction.
+        Args:
+            kind: job kind
+    """
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue_job(kind: str, payload: dict = None, max_attempts: int = None, run_after=None) -> BackgroundJob:
+    """
+        This function queues a job for the run_worker command
+        Args:
+            kind: a registered job kind
+            payload: JSON-able handler arguments
+            max_attempts: runs before the job fails, ATS_JOB_MAX_ATTEMPTS by default
+            run_after: earliest start time, now by default
+        Returns:
+            job: BackgroundJob
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"{kind} is an invalid job kind. Add from choices {sorted(JOB_HANDLERS)}")
+    if max_attempts is None:
+        max_attempts = settings.ATS_JOB_MAX_ATTEMPTS
+    if isinstance(max_attempts, bool) or not isinstance(max_attempts, int) or max_attempts < 1:
+        raise ValueError(f"{max_attempts} is an invalid max_attempts.")
+    return BackgroundJob.objects.create(kind=kind, payload=payload or {}, max_attempts=max_attempts,
+                                        run_after=run_after or timezone.now())
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def retry_delay(attempts: int) -> float:
+    """
+        This function returns the exponential backoff before the next attempt
+        Args:
+            attempts: attempts made so far
+        Returns:
+            seconds: float
+    """
+    return min(settings.ATS_JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+               settings.ATS_JOB_RETRY_BACKOFF_MAX_SECONDS)
+
+
+def requeue_stale_jobs() -> int:
+    """
+        This function puts back running jobs whose worker stopped reporting for ATS_JOB_LEASE_SECONDS,
+        e.g. after a crash. Jobs that used up max_attempts fail instead, so a job that keeps
+        killing its worker is not retried forever.
+        Returns:
+            count: number of jobs requeued or failed
+    """
+    now = timezone.now()
+    expired = BackgroundJob.objects.filter(state=BackgroundJobState.RUNNING,
+                                           locked_at__lt=now - timedelta(seconds=settings.ATS_JOB_LEASE_SECONDS))
+    failed = expired.filter(attempts__gte=F("max_attempts")).update(
+        state=BackgroundJobState.FAILED, error="The worker stopped reporting progress.", finished_at=now,
+        locked_by=None, locked_at=None)
+    requeued = expired.update(state=BackgroundJobState.QUEUED, locked_by=None, locked_at=None)
+    return failed + requeued
+
+
+def claim_job(worker_id: str):
+    """
+        This function claims the next due job with a conditional UPDATE, so concurrent
+        workers never run the same job
+        Args:
+            worker_id: identifies the claiming worker
+        Returns:
+            (job_id, lock) of the claimed job, or None when the queue is empty. The lock is unique
+            to this claim, so a run whose lease expired cannot update the job once it is reclaimed,
+            even by a thread of the same worker.
+    """
+    while True:
+        now = timezone.now()
+        job_id = BackgroundJob.objects.filter(
+            state=BackgroundJobState.QUEUED, run_after__lte=now,
+        ).order_by("run_after", "id").values_list("id", flat=True).first()
+        if job_id is None:
+            return None
+        lock = f"{worker_id[:60]}:{uuid.uuid4().hex}"
+        claimed = BackgroundJob.objects.filter(id=job_id, state=BackgroundJobState.QUEUED).update(
+            state=BackgroundJobState.RUNNING, locked_by=lock, locked_at=now, attempts=F("attempts") + 1)
+        if claimed:
+            return job_id, lock
+
+
+def run_job(job_id: int, lock: str) -> str:
+    """
+        This function runs a claimed job and records its result, or schedules a retry with
+        exponential backoff until max_attempts is reached
+        Args:
+            job_id: id returned by claim_job
+            lock: lock returned by claim_job
+        Returns:
+            state: final BackgroundJobState of this attempt
+    """
+    job = BackgroundJob.objects.get(id=job_id)
+    owned = BackgroundJob.objects.filter(id=job_id, locked_by=lock)
+
+    def progress(fraction: float) -> None:
+        # doubles as the lease heartbeat
+        owned.update(progress=min(max(fraction, 0), 1), locked_at=timezone.now())
+
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        result = handler(job.payload, progress)
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            state = BackgroundJobState.QUEUED
+            run_after = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            owned.update(state=state, error=str(e), run_after=run_after, locked_by=None, locked_at=None)
+        else:
+            state = BackgroundJobState.FAILED
+            owned.update(state=state, error=str(e), finished_at=timezone.now(), locked_by=None, locked_at=None)
+        return state
+
+    state = BackgroundJobState.SUCCEEDED
+    owned.update(state=state, result=result, error=None, progress=1, finished_at=timezone.now(),
+                 locked_by=None, locked_at=None)
+    return state
+
+
+def execute_job(job_id: int, lock: str) -> str:
+    """
+        Pool entry point: runs a job, then releases the database connection of this thread or process
+    """
+    try:
+        return run_job(job_id, lock)
+    finally:
+        close_old_connections()
+
+
+def run_next_job(worker_id: str = None):
+    """
+        This function claims and runs one due job in the calling thread
+        Args:
+            worker_id: identifies the worker, hostname and pid by default
+        Returns:
+            state: final state of the job, or None when the queue is empty
+    """
+    claim = claim_job(worker_id or default_worker_id())
+    return None if claim is None else run_job(*claim)
+
+
+def job_response_json(job: BackgroundJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "state": job.state,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "run_after": job.run_after,
+        "finished_at": job.finished_at,
+    }
+
+
+@job_handler("import_candidates")
+def import_candidates_job(payload: dict, progress) -> dict:
+    """
+        Bulk import of payload["rows"], a list of candidate payloads, or of a raw NDJSON or CSV
+        payload["body"] with its payload["content_type"]
+    """
+    if "rows" in payload:
+        rows = payload["rows"]
+    else:
+        rows = list(read_candidate_body(payload["body"].encode(), payload["content_type"]))
+    result = import_candidates(rows, policy=payload.get("dedup_policy"),
+                               progress=lambda processed: progress(processed / max(len(rows), 1)))
+    if result["created"] or result["merged"]:
+        invalidate_candidates([row["id"] for row in result["duplicates"]] if result["merged"] else ())
+    return result
+
+
+@job_handler("rebuild_name_index")
+def rebuild_name_index_job(payload: dict, progress) -> dict:
+    total = Candidate.objects.count()
+    indexed = rebuild_candidate_name_index(payload.get("batch_size", 1000),
+                                           progress=lambda count: progress(count / max(total, 1)))
+    return {"indexed": indexed}
+
+
+@job_handler("export_candidates")
+def export_candidates_job(payload: dict, progress) -> dict:
+    """
+        Export of a candidate search (payload["search"], the export request body) to a file in ATS_EXPORT_DIR
+    """
+    search = payload.get("search", {})
+    candidates = Candidate.objects.filter(**build_candidate_search_filters(search))
+    export_format = get_export_format(search.get("format"))
+    gzip = bool(search.get("gzip"))
+    options = build_candidate_search_options(search)
+    total = candidates.count()
+    if options["limit"] is not None:
+        total = min(total, options["limit"])
+    # progress per fetched chunk doubles as the lease heartbeat of long exports
+    chunks = export_candidates(candidates, export_format, gzip,
+                               progress=lambda exported: progress(exported / max(total, 1)), **options)
+    os.makedirs(settings.ATS_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.ATS_EXPORT_DIR, f"{uuid.uuid4().hex}-{export_filename(export_format, gzip)}")
+    size = 0
+    with open(path, "wb") as export_file:
+        for chunk in chunks:
+            export_file.write(chunk)
+            size += len(chunk)
+    return {"path": path, "bytes": size}
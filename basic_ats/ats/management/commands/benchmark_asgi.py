@@ -0,0 +1,122 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from ats.synthetic import temporary_candidates
+from .benchmark_search import percentile
+
+
+class Command(BaseCommand):
+    help = ("Compare requests/sec and tail latency of the WSGI views and the async views under ASGI "
+            "at a fixed concurrency. Runs in-process; seeded rows are deleted afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per deployment")
+        parser.add_argument("--rows", type=int, default=1000, help="Candidates seeded")
+
+    def handle(self, *args, **options):
+        overrides = {
+            # both paths must hit the database, not the response cache
+            "CACHES": {**settings.CACHES, "ats-benchmark": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+            "ATS_CACHE_ALIAS": "ats-benchmark",
+            # host used by the in-process test clients
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        }
+        user, user_created = User.objects.get_or_create(username="ats-benchmark")
+        token = str(AccessToken.for_user(user))
+        try:
+            with override_settings(**overrides), temporary_candidates(options["rows"], seed=2) as ids:
+                report = {
+                    "concurrency": options["concurrency"],
+                    "requests": options["requests"],
+                    "wsgi": self.run_wsgi(self.requests(ids, options["requests"], ""), token,
+                                          options["concurrency"]),
+                    "asgi": asyncio.run(self.run_asgi(self.requests(ids, options["requests"], "async_"), token,
+                                                      options["concurrency"])),
+                }
+        finally:
+            if user_created:
+                user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def requests(self, ids: list, count: int, prefix: str) -> list:
+        """
+            Same read mix for both deployments: get by id, filtered search and name search
+        """
+        mix = []
+        for i in range(count):
+            if i % 3 == 0:
+                mix.append(("get", reverse(f"{prefix}get_candidate", args=[ids[i % len(ids)]]), None))
+            elif i % 3 == 1:
+                age = 20 + i % 40
+                mix.append(("post", reverse(f"{prefix}search_candidate"), {"age_min": age, "age_max": age}))
+            else:
+                mix.append(("post", reverse(f"{prefix}search_by_name"),
+                            {"name": ["john", "priya smith", "rao"][i % 3]}))
+        return mix
+
+    def summarise(self, latencies: list, errors: int, elapsed: float) -> dict:
+        return {
+            "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "errors": errors,
+        }
+
+    def run_wsgi(self, mix: list, token: str, concurrency: int) -> dict:
+        local = threading.local()
+        errors = []
+
+        def send(request):
+            if not hasattr(local, "client"):
+                local.client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+            method, path, body = request
+            start = time.perf_counter()
+            if method == "get":
+                response = local.client.get(path)
+            else:
+                response = local.client.post(path, body, content_type="application/json")
+            latency = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                errors.append(path)
+            close_old_connections()
+            return latency
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(send, mix))
+        return self.summarise(latencies, len(errors), time.perf_counter() - start)
+
+    async def run_asgi(self, mix: list, token: str, concurrency: int) -> dict:
+        client = AsyncClient()
+        headers = {"Authorization": f"Bearer {token}"}
+        semaphore = asyncio.Semaphore(concurrency)
+        errors = []
+
+        async def send(request):
+            method, path, body = request
+            async with semaphore:
+                start = time.perf_counter()
+                if method == "get":
+                    response = await client.get(path, headers=headers)
+                else:
+                    response = await client.post(path, body, content_type="application/json", headers=headers)
+                latency = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                errors.append(path)
+            return latency
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(send(request) for request in mix))
+        return self.summarise(latencies, len(errors), time.perf_counter() - start)
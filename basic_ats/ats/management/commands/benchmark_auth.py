@@ -0,0 +1,66 @@
+import json
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from ats.authentication import CachedJWTAuthentication, token_cache, user_cache
+from ats.models import Candidate
+from ats.synthetic import seed_candidates
+from ats.views import CreateCandidateApi
+
+
+def time_requests(func, count: int) -> dict:
+    """
+        This function calls func count times and reports the mean latency and queries per call
+    """
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        elapsed = time.perf_counter() - start
+    return {"mean_us": round(elapsed / count * 1e6, 1), "queries_per_request": round(len(queries) / count, 2)}
+
+
+class Command(BaseCommand):
+    help = ("Measure the authentication overhead per request of JWTAuthentication and CachedJWTAuthentication, "
+            "alone and on get/candidate/<pk>. Seeded rows are rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per measurement")
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        report = {"requests": count}
+        with transaction.atomic():
+            user = User.objects.create_user(username="benchmark-auth", password="secret")
+            seed_candidates(1, seed=5, index_names=False)
+            token = str(AccessToken.for_user(user))
+            request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            token_cache.clear()
+            user_cache.clear()
+
+            for label, authentication in (("jwt", JWTAuthentication()), ("cached_jwt", CachedJWTAuthentication())):
+                authentication.authenticate(request)
+                report[f"authenticate_{label}"] = time_requests(lambda: authentication.authenticate(request), count)
+
+            # the same view with each class, the response cache stays warm so auth dominates
+            client = APIClient(HTTP_HOST="localhost")
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            url = reverse("get_candidate", args=[Candidate.objects.values_list("id", flat=True).first()])
+            authentication_classes = CreateCandidateApi.authentication_classes
+            try:
+                for label, authentication_class in (("jwt", JWTAuthentication), ("cached_jwt", CachedJWTAuthentication)):
+                    CreateCandidateApi.authentication_classes = [authentication_class]
+                    client.get(url)
+                    report[f"get_candidate_{label}"] = time_requests(lambda: client.get(url), count)
+            finally:
+                CreateCandidateApi.authentication_classes = authentication_classes
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ats import constants
+from ats.db import apply_sqlite_pragmas
+from ats.synthetic import delete_candidates, generate_candidate_payloads, temporary_candidates
+
+
+# SQLite defaults, used for the --baseline run
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+
+class Command(BaseCommand):
+    help = ("Run concurrent readers and writers against the ats endpoints and report throughput. "
+            "Writes to the configured database; only the rows seeded and created by the run are deleted afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+        parser.add_argument("--rows", type=int, default=1000, help="Candidates seeded for readers")
+        parser.add_argument("--baseline", action="store_true",
+                            help="Use SQLite defaults and a new connection per request for comparison")
+
+    def handle(self, *args, **options):
+        pragmas = BASELINE_PRAGMAS if options["baseline"] else settings.ATS_SQLITE_PRAGMAS
+        conn_max_age = {alias: connections[alias].settings_dict["CONN_MAX_AGE"] for alias in connections}
+        user, user_created = User.objects.get_or_create(username="ats-benchmark")
+        created_ids = []
+        try:
+            with override_settings(ATS_SQLITE_PRAGMAS=pragmas):
+                if options["baseline"]:
+                    for alias in connections:
+                        connections[alias].settings_dict["CONN_MAX_AGE"] = 0
+                connection.close()
+                apply_sqlite_pragmas(connection)
+                with temporary_candidates(options["rows"], seed=1) as read_ids:
+                    counters, elapsed = self.run_workers(user, read_ids, created_ids, options)
+        finally:
+            for alias, max_age in conn_max_age.items():
+                connections[alias].settings_dict["CONN_MAX_AGE"] = max_age
+            delete_candidates(created_ids)
+            if user_created:
+                user.delete()
+
+        self.stdout.write(json.dumps({
+            "mode": "baseline" if options["baseline"] else "tuned",
+            "pragmas": pragmas,
+            "readers": options["readers"],
+            "writers": options["writers"],
+            "seconds": round(elapsed, 2),
+            "reads_per_sec": round(counters["reads"] / elapsed, 1),
+            "writes_per_sec": round(counters["writes"] / elapsed, 1),
+            "errors": counters["errors"],
+        }, indent=2))
+
+    def run_workers(self, user, read_ids: list, created_ids: list, options: dict) -> tuple:
+        stop = threading.Event()
+        counters = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker(kind: str, index: int):
+            client = APIClient(HTTP_HOST="localhost")
+            client.force_authenticate(user=user)
+            payloads = generate_candidate_payloads(10 ** 9, seed=100 + index)
+            done = errors = 0
+            created = []
+            while not stop.is_set():
+                if kind == "reads":
+                    if done % 2:
+                        response = client.get(reverse("get_candidate", args=[read_ids[done % len(read_ids)]]))
+                    else:
+                        response = client.post(reverse("search_candidate"), {"age_min": 30, "age_max": 31},
+                                               format="json")
+                else:
+                    payload = next(payloads)
+                    payload["gender"] = "Male"
+                    payload["phone_number"] = int(payload["phone_number"])
+                    response = client.post(reverse("create_candidate"), payload, format="json")
+                if response.status_code == 200:
+                    done += 1
+                    # an existing candidate is returned for a duplicate, it is not ours to delete
+                    if kind == "writes" and response.json()["message"] == constants.SUCCESSFUL_CREATION:
+                        created.append(response.json()["id"])
+                else:
+                    errors += 1
+                # what the WSGI handler does at the end of each request
+                close_old_connections()
+            connection.close()
+            with lock:
+                counters[kind] += done
+                counters["errors"] += errors
+                created_ids.extend(created)
+
+        threads = [threading.Thread(target=worker, args=("reads", i)) for i in range(options["readers"])]
+        threads += [threading.Thread(target=worker, args=("writes", i)) for i in range(options["writers"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options["duration"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return counters, elapsed
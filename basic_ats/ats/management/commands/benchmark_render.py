@@ -0,0 +1,57 @@
+import json
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from ats.models import Candidate
+from ats.renderers import FastJSONRenderer, orjson, render_candidate_rows
+from ats.synthetic import seed_candidates
+from ats.utils import candidate_row_to_json, candidate_values
+
+
+def drf_list(rows) -> bytes:
+    """
+        The previous search path: a list of response dicts rendered by DRF's JSONRenderer
+    """
+    return JSONRenderer().render([candidate_row_to_json(row) for row in rows])
+
+
+def fast_list(rows) -> bytes:
+    return FastJSONRenderer().render([candidate_row_to_json(row) for row in rows])
+
+
+def fast_direct(rows) -> bytes:
+    return FastJSONRenderer().render(render_candidate_rows(rows))
+
+
+class Command(BaseCommand):
+    help = ("Compare serialization time and peak memory of a large search response with DRF's "
+            "JSONRenderer and FastJSONRenderer. Seeded rows are rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Candidates in the response")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs, the best one is reported")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_candidates(options["rows"], seed=3, index_names=False)
+            rows = list(candidate_values(Candidate.objects.order_by("id")))
+            transaction.set_rollback(True)
+
+        expected = json.loads(drf_list(rows))
+        report = {"rows": len(rows), "orjson": orjson is not None}
+        for label, func in (("drf_list", drf_list), ("fast_list", fast_list), ("fast_direct", fast_direct)):
+            assert json.loads(func(rows)) == expected, f"{label} output differs"
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                content = func(rows)
+                timings.append((time.perf_counter() - start) * 1000)
+            tracemalloc.start()
+            func(rows)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report[label] = {"best_ms": round(min(timings), 2), "peak_mb": round(peak / 2 ** 20, 2),
+                             "bytes": len(content)}
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,109 @@
+import json
+import re
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ats.models import Candidate
+from ats.synthetic import generate_candidate_payloads, seed_candidates
+from ats.utils import build_candidate_search_filters, candidate_values, prepare_candidate_response_json
+
+
+# Search shapes sent by our screening clients
+SEARCH_SCENARIOS = {
+    "salary_range": {"expected_salary_min": 80000, "expected_salary_max": 120000},
+    "age_range": {"age_min": 25, "age_max": 30},
+    "min_experience": {"years_of_exp_min": 20},
+    "salary_and_experience": {"expected_salary_min": 80000, "expected_salary_max": 120000, "years_of_exp_min": 10},
+    "age_and_salary": {"age_min": 25, "age_max": 30, "expected_salary_min": 80000, "expected_salary_max": 120000},
+    "phone_number": {"phone_number": "6000000042"},
+    "email": {"email": "candidate42@example.com"},
+    "name_contains": {"name": "smith"},
+}
+
+# a plan line that reads a whole table without an index
+FULL_SCAN = re.compile(r"\bSCAN (\w+)$")
+
+
+def percentile(samples: list, pct: float) -> float:
+    samples = sorted(samples)
+    index = min(len(samples) - 1, round(pct / 100 * (len(samples) - 1)))
+    return samples[index]
+
+
+class Command(BaseCommand):
+    help = ("Seed synthetic candidates and report query plans and latency for each search filter, "
+            "and the throughput of the create endpoint")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Candidates to seed")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per scenario")
+        parser.add_argument("--creates", type=int, default=500, help="Candidates created through the API")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the seeded rows instead of rolling them back")
+
+    def handle(self, *args, **options):
+        report = {"rows": options["rows"], "scenarios": {}}
+        with transaction.atomic():
+            seed_candidates(options["rows"], seed=options["seed"])
+            for scenario, payload in SEARCH_SCENARIOS.items():
+                report["scenarios"][scenario] = self.run_scenario(payload, options["repeat"])
+            report["create"] = self.run_creates(options["creates"], options["seed"])
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(report, indent=2))
+        full_scans = [name for name, result in report["scenarios"].items() if result["full_scan"]]
+        if full_scans:
+            self.stderr.write(f"Full table scan in: {', '.join(full_scans)}")
+
+    def run_scenario(self, payload: dict, repeat: int) -> dict:
+        candidates = Candidate.objects.filter(**build_candidate_search_filters(payload))
+        plan = candidate_values(candidates).explain().splitlines()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = prepare_candidate_response_json(candidates)
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            "filters": payload,
+            "matches": len(rows),
+            "plan": plan,
+            "full_scan": any(FULL_SCAN.search(line.strip()) for line in plan),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+        }
+
+    def run_creates(self, count: int, seed: int) -> dict:
+        """
+            Sequential POSTs to the create endpoint, validation and name indexing included
+        """
+        user = User.objects.create(username="ats-benchmark-create")
+        client = APIClient(HTTP_HOST="localhost")
+        client.force_authenticate(user=user)
+        payloads = generate_candidate_payloads(count, seed=seed + 1)
+        path = reverse("create_candidate")
+        timings = []
+        errors = 0
+        start = time.perf_counter()
+        for payload in payloads:
+            # the create schema takes request-form values
+            payload["gender"] = "Male"
+            payload["phone_number"] = int(payload["phone_number"])
+            request_start = time.perf_counter()
+            response = client.post(path, payload, format="json")
+            timings.append((time.perf_counter() - request_start) * 1000)
+            errors += response.status_code != 200
+        elapsed = time.perf_counter() - start
+        user.delete()
+        return {
+            "requests": count,
+            "creates_per_sec": round(count / elapsed, 1),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "errors": errors,
+        }
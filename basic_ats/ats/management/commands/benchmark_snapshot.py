@@ -0,0 +1,63 @@
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ats.models import Candidate
+from ats.snapshot import CandidateSnapshot, np
+from ats.synthetic import seed_candidates
+from ats.utils import build_candidate_search_filters, fetch_candidate_rows, prepare_candidate_response_json
+from .benchmark_search import SEARCH_SCENARIOS
+
+
+def timed(func, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, round(statistics.median(timings), 3)
+
+
+class Command(BaseCommand):
+    help = "Compare SearchCandidate range filters on the ORM with the in-process candidate snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000],
+                            help="Table sizes to benchmark")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario, median reported")
+
+    def handle(self, *args, **options):
+        report = {"numpy": np is not None, "runs": []}
+        for rows in options["rows"]:
+            with transaction.atomic():
+                seed_candidates(rows, index_names=False)
+                report["runs"].append(self.run(rows, options["repeat"]))
+                transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, rows: int, repeat: int) -> dict:
+        snapshot = CandidateSnapshot()
+        start = time.perf_counter()
+        snapshot.refresh()
+        result = {"rows": rows, "snapshot_build_ms": round((time.perf_counter() - start) * 1000, 1),
+                  "scenarios": {}}
+
+        for scenario, payload in SEARCH_SCENARIOS.items():
+            filters = build_candidate_search_filters(payload)
+            if not CandidateSnapshot.supports(filters):
+                continue
+            candidates = Candidate.objects.filter(**filters)
+            orm_ids, orm_ids_ms = timed(lambda: list(candidates.order_by("id").values_list("id", flat=True)), repeat)
+            _, orm_rows_ms = timed(lambda: prepare_candidate_response_json(candidates), repeat)
+            snapshot_ids, snapshot_ids_ms = timed(lambda: snapshot.filter_ids(filters), repeat)
+            _, snapshot_rows_ms = timed(lambda: fetch_candidate_rows(snapshot.filter_ids(filters)), repeat)
+            result["scenarios"][scenario] = {
+                "matches": len(orm_ids),
+                "same_ids": orm_ids == snapshot_ids,
+                "orm_filter_ms": orm_ids_ms,
+                "snapshot_filter_ms": snapshot_ids_ms,
+                "orm_rows_ms": orm_rows_ms,
+                "snapshot_rows_ms": snapshot_rows_ms,
+            }
+        return result
@@ -0,0 +1,55 @@
+import copy
+import json
+import re
+import timeit
+import jsonschema
+from django.core.management.base import BaseCommand
+from ats.utils import (CREATE_CANDIDATE_SCHEMA, validate_ceate_candidate_request_body, verify_email_address,
+                       verify_phone_number)
+
+
+PAYLOAD = {
+    "name": "John Doe",
+    "age": 30,
+    "gender": "Male",
+    "phone_number": 1234567890,
+    "email": "john.doe@example.com",
+    "years_of_exp": 5,
+    "current_salary": 50000,
+    "expected_salary": 60000,
+}
+
+
+def validate_per_request(data: dict) -> None:
+    """
+        The previous create path: schema literal, validator and regexes built on every call
+    """
+    schema = copy.deepcopy(CREATE_CANDIDATE_SCHEMA)
+    try:
+        jsonschema.validate(instance=data, schema=schema)
+    except jsonschema.exceptions.ValidationError:
+        pass
+    re.match(r'^\d{10}$', str(data["phone_number"]))
+    re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', data["email"])
+
+
+def validate_precompiled(data: dict) -> None:
+    validate_ceate_candidate_request_body(data)
+    verify_phone_number(data["phone_number"])
+    verify_email_address(data["email"])
+
+
+class Command(BaseCommand):
+    help = "Compare the per-request cost of create-candidate validation before and after precompilation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=2000, help="Validations per timed run")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs, the best one is reported")
+
+    def handle(self, *args, **options):
+        report = {}
+        for label, func in (("per_request", validate_per_request), ("precompiled", validate_precompiled)):
+            best = min(timeit.repeat(lambda: func(PAYLOAD), number=options["number"], repeat=options["repeat"]))
+            report[label] = {"us_per_call": round(best / options["number"] * 1e6, 2)}
+        report["speedup"] = round(report["per_request"]["us_per_call"] / report["precompiled"]["us_per_call"], 1)
+        self.stdout.write(json.dumps(report, indent=2))
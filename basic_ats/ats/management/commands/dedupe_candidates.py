@@ -0,0 +1,96 @@
+import json
+from collections import defaultdict
+from contextlib import nullcontext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ats.cache import invalidate_candidates
+from ats.dedup import MERGE_FIELDS, candidate_dedup_key, existing_dedup_keys, merge_candidates
+from ats.models import Candidate, JobStatus
+
+
+# fields a keeper may take over from its duplicates
+CANDIDATE_FIELDS = (*MERGE_FIELDS, "status", "reason")
+
+
+def merged_fields(members: list) -> dict:
+    """
+        This function merges candidates of one person, oldest first. Profile fields come from the
+        latest application; status and reason from the oldest candidate past APPLIED, so a review
+        decision is never lost.
+        Args:
+            members: Candidate objects sharing a dedup key, in id order
+        Returns:
+            fields: dict of CANDIDATE_FIELDS values for the keeper
+    """
+    fields = {field: getattr(members[-1], field) for field in MERGE_FIELDS}
+    reviewed = next((a_candidate for a_candidate in members if a_candidate.status != JobStatus.APPLIED), members[0])
+    fields.update(status=reviewed.status, reason=reviewed.reason)
+    return fields
+
+
+class Command(BaseCommand):
+    help = ("Give a dedup key to every candidate without one and merge candidates sharing a key into "
+            "the oldest of them. The table is read in id-ordered batches, one transaction per batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Candidates read per batch, ATS_IMPORT_BATCH_SIZE by default")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change and roll back")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or settings.ATS_IMPORT_BATCH_SIZE
+        report = {"scanned": 0, "keyed": 0, "duplicates_removed": 0, "keeper_updates": 0}
+        # a dry run wraps the batches in one transaction that is rolled back
+        with transaction.atomic() if options["dry_run"] else nullcontext():
+            self.dedupe(batch_size, report, invalidate=not options["dry_run"])
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def dedupe(self, batch_size: int, report: dict, invalidate: bool) -> None:
+        last_id = 0
+        while True:
+            batch = list(
+                Candidate.objects.filter(dedup_key__isnull=True, id__gt=last_id).order_by("id")
+                .only("id", "email", "phone_number", *CANDIDATE_FIELDS)[:batch_size]
+            )
+            if not batch:
+                return
+            last_id = batch[-1].id
+
+            with transaction.atomic():
+                keys = {a_candidate.id: candidate_dedup_key(a_candidate.email, a_candidate.phone_number)
+                        for a_candidate in batch}
+                # keyed rows are keepers from earlier batches or rows created since the key exists,
+                # which may be newer than the unkeyed rows of this batch
+                keyed_ids = existing_dedup_keys(keys.values()).values()
+                groups = defaultdict(list)
+                for a_candidate in Candidate.objects.filter(id__in=list(keyed_ids)).only("id", "dedup_key",
+                                                                                            *CANDIDATE_FIELDS):
+                    groups[a_candidate.dedup_key].append(a_candidate)
+                for a_candidate in batch:
+                    groups[keys[a_candidate.id]].append(a_candidate)
+
+                keyed, duplicate_ids, merges = [], [], {}
+                for key, members in groups.items():
+                    # the oldest candidate is kept, later ones are merged into it in id order
+                    members.sort(key=lambda a_candidate: a_candidate.id)
+                    keeper, duplicates = members[0], members[1:]
+                    if keeper.dedup_key is None:
+                        keeper.dedup_key = key
+                        keyed.append(keeper)
+                    if duplicates:
+                        duplicate_ids.extend(a_candidate.id for a_candidate in duplicates)
+                        merges[keeper.id] = merged_fields(members)
+
+                # deleting first frees the key of a newer keyed duplicate for its keeper
+                Candidate.objects.filter(id__in=duplicate_ids).delete()
+                Candidate.objects.bulk_update(keyed, ["dedup_key"])
+                merge_candidates(merges, CANDIDATE_FIELDS)
+
+            if invalidate and duplicate_ids:
+                invalidate_candidates([*merges, *duplicate_ids])
+            report["scanned"] += len(batch)
+            report["keyed"] += len(keyed)
+            report["duplicates_removed"] += len(duplicate_ids)
+            report["keeper_updates"] += len(merges)
@@ -0,0 +1,33 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from ats.dedup import DEDUP_POLICIES
+from ats.importer import IMPORT_FORMATS, import_candidates, read_candidate_rows
+
+
+class Command(BaseCommand):
+    help = "Import candidates from a JSON array, NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import")
+        parser.add_argument("--format", choices=IMPORT_FORMATS,
+                            help="File format, guessed from the extension when omitted")
+        parser.add_argument("--batch-size", type=int, help="Rows validated and inserted per transaction")
+        parser.add_argument("--dedup-policy", choices=DEDUP_POLICIES,
+                            help="What to do with rows of existing candidates, ATS_DEDUP_POLICY by default")
+
+    def handle(self, *args, **options):
+        import_format = options["format"] or os.path.splitext(options["path"])[1].lstrip(".").lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot guess the format of {options['path']}, pass --format")
+
+        with open(options["path"], newline="") as source:
+            result = import_candidates(read_candidate_rows(source, import_format), options["batch_size"],
+                                       options["dedup_policy"])
+
+        for error in result["errors"]:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} candidates, {len(result['duplicates'])} duplicates "
+            f"({result['merged']} merged), {len(result['errors'])} rows rejected"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ats.name_index import rebuild_candidate_name_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the candidate name token and trigram indexes for existing candidates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Candidates re-indexed per transaction")
+
+    def handle(self, *args, **options):
+        indexed = rebuild_candidate_name_index(
+            options["batch_size"], progress=lambda count: self.stdout.write(f"Indexed {count} candidates"))
+        self.stdout.write(self.style.SUCCESS(f"Name index rebuilt for {indexed} candidates"))
@@ -0,0 +1,27 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ats.db import refresh_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = ("Copy the default SQLite database onto the local read replicas (ATS_READ_DATABASES) with SQLite's "
+            "online backup API, once or every --interval seconds.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("aliases", nargs="*", help="Replica aliases, ATS_READ_DATABASES by default")
+        parser.add_argument("--pages", type=int, default=-1, help="Pages copied per backup step, -1 for all at once")
+        parser.add_argument("--interval", type=float, help="Keep refreshing every N seconds")
+
+    def handle(self, *args, **options):
+        aliases = options["aliases"] or settings.ATS_READ_DATABASES
+        if not aliases:
+            self.stderr.write("No replica: pass aliases or set ATS_READ_DATABASES")
+            return
+        while True:
+            for alias in aliases:
+                seconds = refresh_sqlite_replica(alias, pages=options["pages"])
+                self.stdout.write(f"Refreshed {alias} in {seconds * 1000:.0f} ms")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,265 @@
+import json
+import platform
+import sqlite3
+import statistics
+import time
+from contextlib import ExitStack
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from ats.instrumentation import RequestStats
+from ats.jobs import enqueue_job
+from ats.models import BackgroundJob
+from ats.renderers import orjson
+from ats.synthetic import (AGE_DISTRIBUTIONS, FIRST_NAMES, LAST_NAMES, NAME_DISTRIBUTIONS, SALARY_DISTRIBUTIONS,
+                           as_request_payload, generate_candidate_payloads, seed_candidates)
+from ats.urls import urlpatterns
+from .benchmark_search import SEARCH_SCENARIOS, percentile
+
+
+CREATE_BULK_SIZE = 50
+UPDATE_BULK_SIZE = 20
+MULTI_GET_SIZE = 100
+
+# metric -> True when higher is better
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "queries_per_request": False,
+}
+
+
+def build_scenarios(ids: list, count: int, seed: int, distributions: dict) -> dict:
+    """
+        This function scripts the requests of every scenario. Reads come first, so that
+        they all see the seeded table; writes use distinct candidates and new people.
+        Args:
+            ids: seeded candidate ids, all APPLIED
+            count: requests per scenario
+            seed: random seed of the seeded candidates
+            distributions: names, salaries and ages of generated payloads
+        Returns:
+            scenarios: dict of name -> (route name, method, list of (url args, body))
+    """
+    def nth_ids(offset: int, size: int = 1) -> list:
+        return [ids[(offset + k) % len(ids)] for k in range(size)]
+
+    def new_people(seed_offset: int, size: int) -> list:
+        payloads = generate_candidate_payloads(size, seed + seed_offset, **distributions)
+        return [as_request_payload(payload) for payload in payloads]
+
+    names = [f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i * 7 % len(LAST_NAMES)]}" for i in range(count)]
+    scenarios = {
+        "get": ("get_candidate", "get", [((candidate_id,), None) for candidate_id in nth_ids(0, count)]),
+        "get_bulk": ("get_candidate_bulk", "post",
+                     [((), {"ids": nth_ids(i * MULTI_GET_SIZE, MULTI_GET_SIZE)}) for i in range(count)]),
+    }
+    for shape, payload in SEARCH_SCENARIOS.items():
+        scenarios[f"search_{shape}"] = ("search_candidate", "post", [((), payload)] * count)
+    scenarios.update({
+        "search_paginated": ("search_candidate", "post", [((), {"paginate": True, "page_size": 50})] * count),
+        "search_top_n": ("search_candidate", "post",
+                         [((), {"order_by": "-salary", "limit": 50, "fields": ["name", "expected_salary"]})] * count),
+        "search_stats": ("search_candidate_stats", "post", [((), {"age_min": 25, "age_max": 40})] * count),
+        "search_by_name": ("search_by_name", "post", [((), {"name": name}) for name in names]),
+        "search_by_name_fuzzy": ("search_by_name", "post",
+                                 [((), {"name": name[:-1], "fuzzy": True}) for name in names]),
+        "export": ("export_candidate", "post", [((), {"format": "csv", "limit": 1000})] * count),
+        "async_get": ("async_get_candidate", "get", [((candidate_id,), None) for candidate_id in nth_ids(0, count)]),
+        "async_search": ("async_search_candidate", "post", [((), SEARCH_SCENARIOS["age_range"])] * count),
+        "async_search_by_name": ("async_search_by_name", "post", [((), {"name": name}) for name in names]),
+        "cache_stats": ("cache_stats", "get", [((), None)] * count),
+        "metrics": ("metrics", "get", [((), None)] * count),
+        "job_status": ("get_job", "get", [((BackgroundJob.objects.order_by("-id").values_list("id", flat=True)[0],),
+                                          None)] * count),
+        "create": ("create_candidate", "post", [((), payload) for payload in new_people(1, count)]),
+        "async_create": ("async_create_candidate", "post", [((), payload) for payload in new_people(2, count)]),
+    })
+    bulk_rows = new_people(3, count * CREATE_BULK_SIZE)
+    scenarios.update({
+        "create_bulk": ("create_candidate_bulk", "post",
+                        [((), bulk_rows[i * CREATE_BULK_SIZE:(i + 1) * CREATE_BULK_SIZE]) for i in range(count)]),
+        "update": ("update_candidate", "put",
+                   [((), {"id": candidate_id, "status": "Shortlisted"}) for candidate_id in nth_ids(0, count)]),
+        "async_update": ("async_update_candidate", "put",
+                         [((), {"id": candidate_id, "status": "Rejected"}) for candidate_id in nth_ids(count, count)]),
+        "update_bulk": ("update_candidate_bulk", "put",
+                        [((), {"ids": nth_ids(2 * count + i * UPDATE_BULK_SIZE, UPDATE_BULK_SIZE),
+                               "status": "Shortlisted"}) for i in range(count)]),
+        "enqueue_job": ("create_job", "post", [((), {"kind": "rebuild_name_index"})] * count),
+    })
+    return scenarios
+
+
+def run_scenario(client: Client, route: str, method: str, requests: list, warmup: int) -> dict:
+    """
+        This function sends the requests of a scenario one after the other and measures each of them
+        Args:
+            client: authenticated test client
+            route: url name
+            method: HTTP method
+            requests: list of (url args, body)
+            warmup: leading requests left out of the results
+        Returns:
+            result: dict of throughput, latency percentiles and SQL queries per request
+    """
+    send = getattr(client, method)
+    timings = []
+    queries = []
+    errors = 0
+    for index, (args, body) in enumerate(requests):
+        path = reverse(route, args=args)
+        stats = RequestStats()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            start = time.perf_counter()
+            if body is None:
+                response = send(path)
+            else:
+                response = send(path, json.dumps(body), content_type="application/json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        if index < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(stats.sql_count)
+        errors += response.status_code >= 300
+    return {
+        "route": route,
+        "method": method.upper(),
+        "requests": len(timings),
+        "errors": errors,
+        "throughput_rps": round(len(timings) / (sum(timings) / 1000), 1),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "queries_per_request": round(statistics.mean(queries), 2),
+    }
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> dict:
+    """
+        This function compares two run_benchmarks reports scenario by scenario
+        Args:
+            baseline: earlier report
+            current: new report
+            threshold: relative change of latency or throughput counted as a regression, e.g. 0.25.
+                       Any increase of queries per request is one.
+        Returns:
+            comparison: dict with differing run settings, changes per scenario and the list of regressions
+    """
+    changes = {}
+    regressions = []
+    # numbers are only comparable between runs of the same workload
+    meta_differences = {key: [baseline.get("meta", {}).get(key), value] for key, value in current.get("meta", {}).items()
+                        if key != "uncovered_routes" and baseline.get("meta", {}).get(key) != value}
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        if before is None:
+            continue
+        changes[scenario] = {}
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result[metric]
+            if old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            changes[scenario][metric] = {"baseline": old, "current": new, "change": round(change, 3)}
+            if metric == "queries_per_request":
+                regressed = new > old
+            else:
+                regressed = change < -threshold if higher_is_better else change > threshold
+            if regressed:
+                regressions.append(f"{scenario}.{metric}: {old} -> {new}")
+    return {"threshold": threshold, "meta_differences": meta_differences, "changes": changes, "regressions": regressions}
+
+
+class Command(BaseCommand):
+    help = ("Benchmark every ats route in-process with the Django test client on synthetic candidates, and report "
+            "throughput, p50/p95/p99 latency and SQL queries per request as JSON. Compare with an earlier run "
+            "with --compare. Runs in one transaction that is rolled back, so seeded and created rows are not kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Candidates seeded")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--names", choices=NAME_DISTRIBUTIONS, default="uniform")
+        parser.add_argument("--salaries", choices=SALARY_DISTRIBUTIONS, default="uniform")
+        parser.add_argument("--ages", choices=AGE_DISTRIBUTIONS, default="uniform")
+        parser.add_argument("--scenarios", nargs="+", help="Run only these scenarios")
+        parser.add_argument("--with-cache", action="store_true",
+                            help="Keep the response cache, by default every request does the full work")
+        parser.add_argument("--output", help="Write the JSON report to this file, e.g. baseline.json")
+        parser.add_argument("--compare", help="Earlier report to compare against")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Relative latency or throughput change counted as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions")
+
+    def handle(self, *args, **options):
+        overrides = {
+            # host used by the in-process test client
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        }
+        if not options["with_cache"]:
+            overrides["CACHES"] = {**settings.CACHES, "ats-benchmark": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+            overrides["ATS_CACHE_ALIAS"] = "ats-benchmark"
+        distributions = {key: options[key] for key in ("names", "salaries", "ages")}
+        count = options["requests"] + options["warmup"]
+
+        report = {
+            "meta": {
+                "rows": options["rows"],
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "seed": options["seed"],
+                "distributions": distributions,
+                "cache": options["with_cache"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "orjson": orjson is not None,
+            },
+            "scenarios": {},
+        }
+        # everything the suite seeds, creates and enqueues is rolled back, other rows are left alone
+        with override_settings(**overrides), transaction.atomic():
+            user = User.objects.create(username="ats-benchmark-suite")
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+            ids = seed_candidates(options["rows"], seed=options["seed"], **distributions)
+            enqueue_job("rebuild_name_index")
+            scenarios = build_scenarios(ids, count, options["seed"], distributions)
+            selected = options["scenarios"] or list(scenarios)
+            unknown = set(selected) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios {sorted(unknown)}. Choose from {list(scenarios)}")
+            for name in selected:
+                route, method, requests = scenarios[name]
+                report["scenarios"][name] = run_scenario(client, route, method, requests, options["warmup"])
+                self.stderr.write(f"{name}: p50 {report['scenarios'][name]['p50_ms']} ms")
+            transaction.set_rollback(True)
+
+        covered = {route for route, _, _ in scenarios.values()}
+        report["meta"]["uncovered_routes"] = sorted(pattern.name for pattern in urlpatterns
+                                                    if pattern.name not in covered)
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                report["comparison"] = compare_reports(json.load(baseline_file), report, options["threshold"])
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(report, output_file, indent=2)
+        self.stdout.write(json.dumps(report, indent=2))
+
+        regressions = report.get("comparison", {}).get("regressions", [])
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regressions: {'; '.join(regressions)}")
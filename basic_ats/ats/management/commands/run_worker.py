@@ -0,0 +1,76 @@
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from ats.jobs import claim_job, default_worker_id, execute_job, requeue_stale_jobs
+
+
+POOLS = ("thread", "process")
+
+
+def init_worker_process():
+    # spawned processes start without Django, forked ones must not reuse the parent's connections
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ("Run queued background jobs on a thread or process pool. Jobs live in the database, "
+            "no broker is needed; start several workers to scale out.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pool", choices=POOLS, help="ATS_JOB_WORKER_POOL by default")
+        parser.add_argument("--concurrency", type=int, help="Jobs run at once, ATS_JOB_WORKER_CONCURRENCY by default")
+        parser.add_argument("--poll-interval", type=float, help="Seconds between polls of an empty queue, "
+                                                                "ATS_JOB_POLL_SECONDS by default")
+        parser.add_argument("--once", action="store_true", help="Exit once no job is due instead of polling")
+
+    def handle(self, *args, **options):
+        pool_kind = options["pool"] or settings.ATS_JOB_WORKER_POOL
+        concurrency = options["concurrency"] or settings.ATS_JOB_WORKER_CONCURRENCY
+        poll_interval = options["poll_interval"] or settings.ATS_JOB_POLL_SECONDS
+        worker_id = default_worker_id()
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write("Stopping after the running jobs")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        if pool_kind == "process":
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=init_worker_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+
+        self.stdout.write(f"Worker {worker_id} running up to {concurrency} jobs on a {pool_kind} pool")
+        running = {}
+        with pool:
+            while not stop.is_set():
+                requeue_stale_jobs()
+                # claim only as many jobs as there are free slots, the rest stay available to other workers
+                while len(running) < concurrency:
+                    claim = claim_job(worker_id)
+                    if claim is None:
+                        break
+                    running[pool.submit(execute_job, *claim)] = claim[0]
+
+                if not running:
+                    if options["once"]:
+                        break
+                    stop.wait(poll_interval)
+                    continue
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.stdout.write(f"Job {job_id} {future.result()}")
+                    except Exception as e:
+                        self.stderr.write(f"Job {job_id} crashed the pool worker: {e}")
+            for future in wait(running).done:
+                self.stdout.write(f"Job {running[future]} {future.result()}")
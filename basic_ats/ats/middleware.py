@@ -0,0 +1,85 @@
+import cProfile
+import os
+import random
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from .instrumentation import RequestStats, current_endpoint, registry
+from .routers import is_client_pinned, pin_client, pinned_to_primary, replica_reads
+
+
+class RequestMetricsMiddleware:
+    """
+        Records wall time, SQL count and SQL time of /ats/ requests, and dumps a cProfile
+        of sampled requests slower than ATS_PROFILE_SLOW_MS into ATS_PROFILE_DIR
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(settings.ATS_METRICS_PATH_PREFIX):
+            return self.get_response(request)
+
+        stats = RequestStats()
+        profiler = None
+        if settings.ATS_PROFILE_SAMPLE_RATE and random.random() < settings.ATS_PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+
+        # relabelled with the resolved route in process_view
+        token = current_endpoint.set("unresolved")
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            current_endpoint.reset(token)
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        registry.observe_request(request.method, route, response.status_code, seconds, stats)
+        if profiler is not None and seconds * 1000 >= settings.ATS_PROFILE_SLOW_MS:
+            self.dump_profile(profiler, request, route)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.path.startswith(settings.ATS_METRICS_PATH_PREFIX) and request.resolver_match is not None:
+            current_endpoint.set(request.resolver_match.route)
+
+    def dump_profile(self, profiler, request, route: str) -> None:
+        os.makedirs(settings.ATS_PROFILE_DIR, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{request.method}-{route.replace('/', '_').strip('_')}.prof"
+        profiler.dump_stats(os.path.join(settings.ATS_PROFILE_DIR, name))
+
+
+class ReadReplicaMiddleware:
+    """
+        Lets ReadReplicaRouter send the reads of ATS_READ_ROUTES to the replicas, unless the client
+        (identified by its Authorization header) wrote in the last ATS_READ_YOUR_WRITES_SECONDS
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # threads serve many requests, start each one on the primary
+        replica_reads.set(False)
+        pinned_to_primary.set(False)
+        response = self.get_response(request)
+        if settings.ATS_READ_DATABASES and pinned_to_primary.get():
+            pin_client(request.META.get("HTTP_AUTHORIZATION", ""))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if (settings.ATS_READ_DATABASES and match is not None and match.url_name in settings.ATS_READ_ROUTES
+                and not is_client_pinned(request.META.get("HTTP_AUTHORIZATION", ""))):
+            replica_reads.set(True)
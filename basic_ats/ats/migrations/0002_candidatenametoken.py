@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateNameToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_tokens', to='ats.candidate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'candidate'], name='ats_name_token_idx')],
+            },
+        ),
+    ]
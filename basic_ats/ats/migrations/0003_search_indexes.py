@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:35
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0002_candidatenametoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['age'], name='ats_candidate_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['phone_number'], name='ats_candidate_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['email'], name='ats_candidate_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='ats_candidate_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['created_at', 'id'], name='ats_candidate_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experience',
+            index=models.Index(fields=['expected_salary', 'years_of_exp'], name='ats_exp_salary_years_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experience',
+            index=models.Index(fields=['years_of_exp'], name='ats_exp_years_idx'),
+        ),
+    ]
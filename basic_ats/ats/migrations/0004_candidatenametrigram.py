@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateNameTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_trigrams', to='ats.candidate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'candidate'], name='ats_name_trigram_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0004_candidatenametrigram'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='candidate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['updated_at'], name='ats_candidate_updated_idx'),
+        ),
+    ]
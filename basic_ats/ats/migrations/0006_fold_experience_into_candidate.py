@@ -0,0 +1,92 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+EXPERIENCE_FIELDS = ("years_of_exp", "current_salary", "expected_salary")
+
+
+def copy_experience_to_candidate(apps, schema_editor):
+    Candidate = apps.get_model("ats", "Candidate")
+    Experience = apps.get_model("ats", "Experience")
+    # one UPDATE with correlated subqueries, no rows are loaded into Python
+    Candidate.objects.update(**{
+        field: Subquery(Experience.objects.filter(pk=OuterRef("experience_id")).values(field)[:1])
+        for field in EXPERIENCE_FIELDS
+    })
+
+
+def copy_candidate_to_experience(apps, schema_editor):
+    Candidate = apps.get_model("ats", "Candidate")
+    Experience = apps.get_model("ats", "Experience")
+    candidates = list(Candidate.objects.only("id", *EXPERIENCE_FIELDS))
+    experiences = Experience.objects.bulk_create([
+        Experience(**{field: getattr(candidate, field) for field in EXPERIENCE_FIELDS})
+        for candidate in candidates
+    ])
+    for candidate, experience in zip(candidates, experiences):
+        candidate.experience_id = experience.id
+    Candidate.objects.bulk_update(candidates, ["experience"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0005_candidate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='years_of_exp',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='current_salary',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='expected_salary',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        # nullable so that the backwards migration can re-create the rows before restoring the constraint
+        migrations.AlterField(
+            model_name='candidate',
+            name='experience',
+            field=models.ForeignKey(null=True, on_delete=models.deletion.CASCADE, to='ats.experience'),
+        ),
+        migrations.RunPython(copy_experience_to_candidate, copy_candidate_to_experience),
+        migrations.AlterField(
+            model_name='candidate',
+            name='years_of_exp',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='candidate',
+            name='current_salary',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='candidate',
+            name='expected_salary',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.RemoveField(
+            model_name='candidate',
+            name='experience',
+        ),
+        migrations.DeleteModel(
+            name='Experience',
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['expected_salary', 'years_of_exp'], name='ats_candidate_salary_years_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['years_of_exp'], name='ats_candidate_years_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0006_fold_experience_into_candidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True, unique=True),
+        ),
+    ]
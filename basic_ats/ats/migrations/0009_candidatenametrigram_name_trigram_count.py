@@ -0,0 +1,37 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def count_name_trigrams(apps, schema_editor):
+    CandidateNameTrigram = apps.get_model("ats", "CandidateNameTrigram")
+    # one UPDATE with a correlated count, the posting list holds each trigram of a name once
+    CandidateNameTrigram.objects.update(name_trigram_count=Subquery(
+        CandidateNameTrigram.objects.filter(candidate_id=OuterRef("candidate_id"))
+        .values("candidate_id").annotate(total=Count("id")).values("total")[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ats', '0008_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidatenametrigram',
+            name='name_trigram_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_name_trigrams, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='candidatenametrigram',
+            name='ats_name_trigram_idx',
+        ),
+        migrations.AddIndex(
+            model_name='candidatenametrigram',
+            index=models.Index(fields=['trigram', 'candidate', 'name_trigram_count'], name='ats_name_trigram_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class JobStatus:
@@ -18,20 +19,97 @@ class Gender:
     ]
 
 
-class Experience(models.Model):
-    years_of_exp = models.FloatField()
-    current_salary = models.DecimalField(max_digits=10, decimal_places=2)
-    expected_salary = models.DecimalField(max_digits=10, decimal_places=2)
-
-
 class Candidate(models.Model):
     name = models.CharField(max_length=100)
     age = models.IntegerField()
     gender = models.CharField(max_length=10, choices=Gender.CHOICES)
     phone_number = models.CharField(max_length=15)
     email = models.EmailField()
-    experience = models.ForeignKey(Experience, on_delete=models.CASCADE)
+    years_of_exp = models.FloatField()
+    current_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    expected_salary = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=15, default=JobStatus.APPLIED)
     reason = models.TextField(blank=True, default=None, null=True)
+    # normalized email and phone number, set at ingest, see ats.dedup
+    dedup_key = models.CharField(max_length=40, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["age"], name="ats_candidate_age_idx"),
+            models.Index(fields=["phone_number"], name="ats_candidate_phone_idx"),
+            models.Index(fields=["email"], name="ats_candidate_email_idx"),
+            models.Index(Lower("name"), name="ats_candidate_name_lower_idx"),
+            models.Index(fields=["created_at", "id"], name="ats_candidate_created_idx"),
+            models.Index(fields=["updated_at"], name="ats_candidate_updated_idx"),
+            models.Index(fields=["expected_salary", "years_of_exp"], name="ats_candidate_salary_years_idx"),
+            models.Index(fields=["years_of_exp"], name="ats_candidate_years_idx"),
+        ]
+
+
+class CandidateNameToken(models.Model):
+    """
+        Inverted index of lowercased name tokens used by name search
+    """
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name="name_tokens")
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token", "candidate"], name="ats_name_token_idx"),
+        ]
+
+
+class CandidateNameTrigram(models.Model):
+    """
+        Posting list of name trigrams used by fuzzy name search
+    """
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name="name_trigrams")
+    trigram = models.CharField(max_length=3)
+    # number of trigrams of the candidate's name, so similarity is computed without reading names
+    name_trigram_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # covers the similarity query, no table row is read per posting
+            models.Index(fields=["trigram", "candidate", "name_trigram_count"], name="ats_name_trigram_idx"),
+        ]
+
+
+class BackgroundJobState:
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+
+class BackgroundJob(models.Model):
+    """
+        A unit of work run by the run_worker command, see ats.jobs
+    """
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    state = models.CharField(max_length=10, choices=BackgroundJobState.CHOICES, default=BackgroundJobState.QUEUED)
+    progress = models.FloatField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "run_after"], name="ats_job_queue_idx"),
+        ]
@@ -0,0 +1,248 @@
+import math
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Q
+from django.db.models.functions import Cast
+from .models import Candidate, CandidateNameToken, CandidateNameTrigram
+from .utils import fetch_candidate_rows
+
+
+EXACT_MATCH_SCORE = 100
+
+# upper bound used to turn a prefix into an indexable range
+MAX_CHAR = "\U0010ffff"
+
+
+def tokenize_name(name: str) -> list:
+    """
+        This function splits a name into distinct lowercased tokens
+        Args:
+            name: candidate name or search query
+        Returns:
+            tokens: list of tokens in first-seen order
+    """
+    return list(dict.fromkeys(name.lower().split()))
+
+
+def name_trigrams(name: str) -> set:
+    """
+        This function returns the trigrams of a name, each word padded like pg_trgm
+        Args:
+            name: candidate name or search query
+        Returns:
+            trigrams: set of 3 character strings
+    """
+    trigrams = set()
+    for word in name.lower().split():
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def sync_candidate_name_index(candidates, replace: bool = True) -> None:
+    """
+        This function rewrites the name tokens and trigrams of the given candidates
+        Args:
+            candidates: iterable of Candidate objects
+            replace: False for new candidates, which have no entries to delete
+    """
+    candidates = list(candidates)
+    sync_candidate_name_tokens(candidates, replace)
+    sync_candidate_name_trigrams(candidates, replace)
+
+
+def rebuild_candidate_name_index(batch_size: int = 1000, progress=None) -> int:
+    """
+        This function rebuilds the name tokens and trigrams of every candidate, one transaction per batch
+        Args:
+            batch_size: candidates re-indexed per transaction
+            progress: optional callable receiving the number of candidates indexed so far
+        Returns:
+            indexed: number of candidates indexed
+    """
+    last_id = 0
+    indexed = 0
+    while True:
+        batch = list(Candidate.objects.filter(id__gt=last_id).order_by("id").only("id", "name")[:batch_size])
+        if not batch:
+            return indexed
+        with transaction.atomic():
+            sync_candidate_name_index(batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
+        if progress is not None:
+            progress(indexed)
+
+
+def sync_candidate_name_trigrams(candidates, replace: bool = True) -> None:
+    """
+        This function rewrites the name trigrams of the given candidates
+        Args:
+            candidates: iterable of Candidate objects
+            replace: False for new candidates, which have no entries to delete
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return
+    if replace:
+        CandidateNameTrigram.objects.filter(candidate__in=candidates).delete()
+    postings = []
+    for a_candidate in candidates:
+        trigrams = name_trigrams(a_candidate.name)
+        postings.extend(CandidateNameTrigram(candidate=a_candidate, trigram=trigram, name_trigram_count=len(trigrams))
+                        for trigram in trigrams)
+    CandidateNameTrigram.objects.bulk_create(postings, batch_size=settings.ATS_ID_CHUNK_SIZE)
+
+
+def sync_candidate_name_tokens(candidates, replace: bool = True) -> None:
+    """
+        This function rewrites the name tokens of the given candidates
+        Args:
+            candidates: iterable of Candidate objects
+            replace: False for new candidates, which have no entries to delete
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return
+    if replace:
+        CandidateNameToken.objects.filter(candidate__in=candidates).delete()
+    CandidateNameToken.objects.bulk_create([
+        CandidateNameToken(candidate=a_candidate, token=token)
+        for a_candidate in candidates
+        for token in tokenize_name(a_candidate.name)
+    ], batch_size=settings.ATS_ID_CHUNK_SIZE)
+
+
+def name_token_matches(query: str):
+    """
+        This function looks up the index entries whose token starts with a query word
+        Args:
+            query: search query
+        Returns:
+            queryset of (candidate_id, token, name) tuples
+    """
+    lookup = Q()
+    for word in set(query.lower().split()):
+        lookup |= Q(token__gte=word, token__lt=word + MAX_CHAR)
+    return CandidateNameToken.objects.filter(lookup).values_list("candidate_id", "token", "candidate__name")
+
+
+def score_name_matches(query: str, matches) -> list:
+    """
+        This function scores candidates from their matching index entries.
+        Each query word adds 1 when the name has a token starting with it and an
+        exact (case-insensitive) name match adds 100, as in the original search.
+        Args:
+            query: search query
+            matches: rows of name_token_matches
+        Returns:
+            ranked: list of (candidate_id, score) sorted by descending score
+    """
+    query_words = query.lower().split()
+    prefixes = set(query_words)
+
+    matched_prefixes = defaultdict(set)
+    names = {}
+    for candidate_id, token, name in matches:
+        names[candidate_id] = name
+        matched_prefixes[candidate_id].update(word for word in prefixes if token.startswith(word))
+
+    query_lower = query.lower()
+    ranked = []
+    for candidate_id, matched in matched_prefixes.items():
+        score = sum(1 for word in query_words if word in matched)
+        if names[candidate_id].lower() == query_lower:
+            score += EXACT_MATCH_SCORE
+        ranked.append((candidate_id, score))
+
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked
+
+
+def rank_candidates_by_name(query: str) -> list:
+    """
+        This function scores candidates against a name query using the token index
+        Args:
+            query: search query
+        Returns:
+            ranked: list of (candidate_id, score) sorted by descending score
+    """
+    return score_name_matches(query, name_token_matches(query))
+
+
+def search_candidates_by_name(query: str) -> list:
+    """
+        This function returns candidate response rows ranked by name relevance
+        Args:
+            query: search query
+        Returns:
+            candidates_response: list of dict
+    """
+    ranked = rank_candidates_by_name(query)
+    rows = fetch_candidate_rows(candidate_id for candidate_id, _ in ranked)
+    return [rows[candidate_id] for candidate_id, _ in ranked if candidate_id in rows]
+
+
+def fuzzy_rank_candidates_by_name(query: str, threshold: float = None, top_k: int = None) -> list:
+    """
+        This function ranks candidates by trigram similarity to a query.
+        Similarity is the Jaccard index of the trigram sets, and an exact (case-insensitive)
+        name match adds 100. Similarity is computed and ranked in SQL from the shared trigram
+        count and the stored trigram count of each name; only the best candidates are read back
+        to check for exact matches.
+        Args:
+            query: search query
+            threshold: minimum similarity between 0 and 1, ATS_FUZZY_THRESHOLD when None
+            top_k: number of candidates returned, ATS_FUZZY_TOP_K when None
+        Returns:
+            ranked: list of (candidate_id, score) sorted by descending score
+    """
+    threshold = settings.ATS_FUZZY_THRESHOLD if threshold is None else threshold
+    top_k = settings.ATS_FUZZY_TOP_K if top_k is None else top_k
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1:
+        raise ValueError(f"{threshold} is an invalid similarity threshold.")
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+        raise ValueError(f"{top_k} is an invalid top_k.")
+    query_trigrams = name_trigrams(query)
+    if not query_trigrams:
+        return []
+
+    # similarity <= shared / len(query trigrams), so this drops candidates before the division
+    min_shared = max(1, math.ceil(threshold * len(query_trigrams)))
+    # the exact match bonus is applied after SQL, so keep some rows beyond top_k: an exact match
+    # ties at similarity 1 with names whose words are reordered
+    shortlist = (CandidateNameTrigram.objects.filter(trigram__in=query_trigrams)
+                 .values_list("candidate_id")
+                 .annotate(shared=Count("id"), name_trigram_count=Max("name_trigram_count"))
+                 .filter(shared__gte=min_shared)
+                 .annotate(similarity=Cast("shared", FloatField())
+                           / (len(query_trigrams) + F("name_trigram_count") - F("shared")))
+                 .filter(similarity__gte=threshold)
+                 .order_by("-similarity", "candidate_id")
+                 .values_list("candidate_id", "similarity")[:top_k * settings.ATS_FUZZY_SHORTLIST_FACTOR])
+    similarities = dict(shortlist)
+
+    query_lower = query.lower()
+    ranked = []
+    for candidate_id, name in Candidate.objects.filter(id__in=list(similarities)).values_list("id", "name"):
+        score = similarities[candidate_id] + (EXACT_MATCH_SCORE if name.lower() == query_lower else 0)
+        ranked.append((candidate_id, score))
+
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked[:top_k]
+
+
+def fuzzy_search_candidates_by_name(query: str, threshold: float = None, top_k: int = None) -> list:
+    """
+        This function returns the top_k candidate response rows most similar to a name query
+        Args:
+            query: search query
+            threshold: minimum similarity, ATS_FUZZY_THRESHOLD when None
+            top_k: number of candidates, ATS_FUZZY_TOP_K when None
+        Returns:
+            candidates_response: list of dict
+    """
+    ranked = fuzzy_rank_candidates_by_name(query, threshold, top_k)
+    rows = fetch_candidate_rows(candidate_id for candidate_id, _ in ranked)
+    return [rows[candidate_id] for candidate_id, _ in ranked if candidate_id in rows]
@@ -0,0 +1,115 @@
+import decimal
+import io
+from itertools import islice
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .instrumentation import timed
+from .utils import CANDIDATE_RESPONSE_KEYS, candidate_row_to_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RENDER_CHUNK_SIZE = 500
+
+# DRF's encoder for everything the fast paths do not handle themselves
+_fallback_encoder = JSONEncoder()
+
+
+class RenderedJSON(bytes):
+    """
+        An already encoded JSON document, written to the response as is
+    """
+
+
+def default(obj):
+    if isinstance(obj, decimal.Decimal):
+        # same as DRF: decimals outside serializers are rendered as numbers
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data) -> bytes:
+        """
+            This function encodes data to compact UTF-8 JSON with orjson
+            Args:
+                data: JSON compatible data, Decimal and datetime included
+            Returns:
+                content: bytes
+        """
+        return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+else:
+    _encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(data) -> bytes:
+        """
+            This function encodes data to compact UTF-8 JSON with the stdlib encoder
+            Args:
+                data: JSON compatible data, Decimal and datetime included
+            Returns:
+                content: bytes
+        """
+        return _encoder.encode(data).encode()
+
+
+@timed("serialization")
+def render_candidate_rows(rows, fields=CANDIDATE_RESPONSE_KEYS) -> RenderedJSON:
+    """
+        This function writes candidate rows straight into a JSON array buffer,
+        no list of response dicts is built
+        Args:
+            rows: iterable of response tuples, e.g. candidate_values(candidates).iterator()
+            fields: response keys the rows were selected with
+        Returns:
+            content: RenderedJSON of the candidate response list
+    """
+    buffer = io.BytesIO()
+    buffer.write(b"[")
+    separator = b""
+    rows = iter(rows)
+    while True:
+        # encode a few hundred rows per call, only that many dicts are alive at once
+        chunk = [candidate_row_to_json(row, fields) for row in islice(rows, RENDER_CHUNK_SIZE)]
+        if not chunk:
+            break
+        buffer.write(separator)
+        buffer.write(dumps(chunk)[1:-1])
+        separator = b","
+    buffer.write(b"]")
+    return RenderedJSON(buffer.getvalue())
+
+
+class FastJSONRenderer(BaseRenderer):
+    """
+        JSON renderer backed by orjson when it is installed, with a stdlib fallback.
+        RenderedJSON content is passed through untouched.
+    """
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, RenderedJSON):
+            return bytes(data)
+        return dumps(data)
+
+
+def attach_facets(results, facets: dict):
+    """
+        This function adds facet counts to a search response
+        Args:
+            results: RenderedJSON list of candidates, or a page dict
+            facets: dict from candidate_facets
+        Returns:
+            response: page dict with facets, or RenderedJSON of {"results": [...], "facets": {...}}
+    """
+    if isinstance(results, dict):
+        return dict(results, facets=facets)
+    return RenderedJSON(b'{"results":' + results + b',"facets":' + dumps(facets) + b"}")
@@ -0,0 +1,72 @@
+import hashlib
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+
+
+# set per request by ReadReplicaMiddleware
+replica_reads = ContextVar("ats_replica_reads", default=False)
+pinned_to_primary = ContextVar("ats_pinned_to_primary", default=False)
+
+
+def _pin_key(client: str) -> str:
+    return f"ats:pin:{hashlib.sha1(client.encode()).hexdigest()}"
+
+
+def is_client_pinned(client: str) -> bool:
+    """
+        This function tells whether a client wrote recently, its reads then stay on the primary
+        Args:
+            client: client identity, e.g. its Authorization header
+        Returns:
+            pinned: bool
+    """
+    return bool(client) and caches[settings.ATS_CACHE_ALIAS].get(_pin_key(client)) is not None
+
+
+def pin_client(client: str) -> None:
+    """
+        This function sends the reads of a client to the primary for ATS_READ_YOUR_WRITES_SECONDS,
+        long enough for the replicas to catch up with its writes
+        Args:
+            client: client identity, e.g. its Authorization header
+    """
+    if client:
+        caches[settings.ATS_CACHE_ALIAS].set(_pin_key(client), 1, timeout=settings.ATS_READ_YOUR_WRITES_SECONDS)
+
+
+def reads_from_replica() -> bool:
+    """
+        This function tells whether the reads of the current request go to a replica, which may
+        lag behind the primary
+        Returns:
+            replica: bool
+    """
+    return bool(settings.ATS_READ_DATABASES) and replica_reads.get() and not pinned_to_primary.get()
+
+
+class ReadReplicaRouter:
+    """
+        Sends the reads of ATS_READ_ROUTES requests to a random ATS_READ_DATABASES alias and everything
+        else to default. A write pins the rest of the request (and the client, see ReadReplicaMiddleware)
+        to default, so a client always reads its own writes.
+    """
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return random.choice(settings.ATS_READ_DATABASES)
+        return None
+
+    def db_for_write(self, model, **hints):
+        pinned_to_primary.set(True)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary, never migrated on their own
+        if db in settings.ATS_READ_DATABASES:
+            return False
+        return None
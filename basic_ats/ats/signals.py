@@ -0,0 +1,35 @@
+from django.db.backends.signals import connection_created
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import invalidate_user
+from .db import apply_sqlite_pragmas
+from .models import Candidate
+from .name_index import sync_candidate_name_index
+
+
+@receiver(post_save, sender=Candidate)
+def update_candidate_name_index(sender, instance, created, update_fields=None, **kwargs):
+    """
+        Keep the name index in sync whenever a candidate is created or renamed
+    """
+    if created or update_fields is None or "name" in update_fields:
+        sync_candidate_name_index([instance], replace=not created)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+        Drop a user from the authentication cache when it is deactivated, changes password or is deleted
+    """
+    invalidate_user(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+    """
+        Apply ATS_SQLITE_PRAGMAS to every new database connection
+    """
+    apply_sqlite_pragmas(connection)
@@ -0,0 +1,217 @@
+import threading
+import time
+from array import array
+from datetime import timedelta
+from collections import defaultdict
+from django.conf import settings
+from .models import Candidate
+from .utils import fetch_candidate_rows
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# search filter -> snapshot column
+RANGE_FILTERS = {
+    "expected_salary__range": "expected_salary",
+    "age__range": "age",
+}
+MIN_FILTERS = {
+    "years_of_exp__gte": "years_of_exp",
+}
+EQUALITY_FILTERS = {
+    "phone_number": "phone_number",
+    "email": "email",
+}
+
+SNAPSHOT_LOOKUPS = ("id", "age", "phone_number", "email", "years_of_exp", "expected_salary", "updated_at")
+
+
+class CandidateSnapshot:
+    """
+        In-process, column oriented copy of the candidate fields used by range filters.
+        Numeric columns are array.array buffers, viewed as NumPy arrays for vectorised
+        masks when NumPy is installed. Phone number and email are hash indexed.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = array("q")
+        self.age = array("d")
+        self.expected_salary = array("d")
+        self.years_of_exp = array("d")
+        self.positions = {}
+        self.equality = {"phone_number": defaultdict(set), "email": defaultdict(set)}
+        self.equality_values = {"phone_number": [], "email": []}
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.stale = True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load_rows(self, rows) -> int:
+        """
+            This function inserts or updates snapshot rows
+            Args:
+                rows: iterable of SNAPSHOT_LOOKUPS tuples
+            Returns:
+                count: number of rows applied
+        """
+        count = 0
+        for candidate_id, age, phone_number, email, years_of_exp, expected_salary, updated_at in rows:
+            position = self.positions.get(candidate_id)
+            if position is None:
+                position = len(self.ids)
+                self.positions[candidate_id] = position
+                self.ids.append(candidate_id)
+                self.age.append(age)
+                self.expected_salary.append(expected_salary)
+                self.years_of_exp.append(years_of_exp)
+                self.equality_values["phone_number"].append(phone_number)
+                self.equality_values["email"].append(email)
+            else:
+                self.age[position] = age
+                self.expected_salary[position] = expected_salary
+                self.years_of_exp[position] = years_of_exp
+                for column, value in (("phone_number", phone_number), ("email", email)):
+                    self.equality[column][self.equality_values[column][position]].discard(position)
+                    self.equality_values[column][position] = value
+            self.equality["phone_number"][phone_number].add(position)
+            self.equality["email"][email].add(position)
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+            count += 1
+        return count
+
+    def refresh(self) -> int:
+        """
+            This function loads candidates changed since the last refresh, found by updated_at.
+            updated_at is set before the writing transaction takes the lock, so a row can commit
+            after newer stamps were loaded; rows stamped within ATS_SNAPSHOT_REFRESH_OVERLAP_SECONDS
+            of the watermark are read again to pick those up.
+            Returns:
+                count: number of rows loaded
+        """
+        with self.lock:
+            candidates = Candidate.objects.all()
+            if self.watermark is not None:
+                overlap = timedelta(seconds=settings.ATS_SNAPSHOT_REFRESH_OVERLAP_SECONDS)
+                candidates = candidates.filter(updated_at__gte=self.watermark - overlap)
+            rows = candidates.order_by("id").values_list(*SNAPSHOT_LOOKUPS).iterator(
+                chunk_size=settings.ATS_SEARCH_STREAM_CHUNK_SIZE)
+            count = self.load_rows(
+                (candidate_id, age, phone_number, email, float(years_of_exp), float(expected_salary), updated_at)
+                for candidate_id, age, phone_number, email, years_of_exp, expected_salary, updated_at in rows
+            )
+            self.refreshed_at = time.monotonic()
+            self.stale = False
+            return count
+
+    def refresh_if_needed(self) -> None:
+        if self.stale or time.monotonic() - self.refreshed_at > settings.ATS_SNAPSHOT_REFRESH_SECONDS:
+            self.refresh()
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    @staticmethod
+    def supports(filters: dict) -> bool:
+        return all(key in RANGE_FILTERS or key in MIN_FILTERS or key in EQUALITY_FILTERS for key in filters)
+
+    def filter_ids(self, filters: dict) -> list:
+        """
+            This function evaluates search filters against the snapshot
+            Args:
+                filters: dict from build_candidate_search_filters, see supports()
+            Returns:
+                ids: matching candidate ids in id order
+        """
+        with self.lock:
+            positions = None
+            for key, value in filters.items():
+                if key in EQUALITY_FILTERS:
+                    matched = self.equality[EQUALITY_FILTERS[key]].get(str(value), set())
+                    positions = matched if positions is None else positions & matched
+            if positions is not None:
+                positions = sorted(positions)
+
+            bounds = []
+            for key, value in filters.items():
+                if key in RANGE_FILTERS:
+                    bounds.append((getattr(self, RANGE_FILTERS[key]), float(value[0]), float(value[1])))
+                elif key in MIN_FILTERS:
+                    bounds.append((getattr(self, MIN_FILTERS[key]), float(value), None))
+
+            if np is not None and positions is None:
+                return self._filter_vectorised(bounds)
+            if positions is None:
+                positions = range(len(self.ids))
+            return sorted(
+                self.ids[position] for position in positions
+                if all(low <= column[position] and (high is None or column[position] <= high)
+                       for column, low, high in bounds)
+            )
+
+    def _filter_vectorised(self, bounds: list) -> list:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for column, low, high in bounds:
+            values = np.frombuffer(column, dtype=np.float64)
+            mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        ids = np.frombuffer(self.ids, dtype=np.int64)[mask]
+        ids.sort()
+        return ids.tolist()
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_candidate_snapshot() -> CandidateSnapshot:
+    """
+        This function returns the process-wide snapshot, refreshed when stale
+        Returns:
+            snapshot: CandidateSnapshot
+    """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = CandidateSnapshot()
+    _snapshot.refresh_if_needed()
+    return _snapshot
+
+
+def mark_candidate_snapshot_stale() -> None:
+    if _snapshot is not None:
+        _snapshot.mark_stale()
+
+
+def snapshot_candidate_ids(filters: dict):
+    """
+        This function answers search filters from the snapshot when it is enabled
+        Args:
+            filters: dict from build_candidate_search_filters
+        Returns:
+            ids: matching candidate ids, or None when the ORM must be used
+    """
+    if not settings.ATS_SNAPSHOT_ENABLED or not filters or not CandidateSnapshot.supports(filters):
+        return None
+    return get_candidate_snapshot().filter_ids(filters)
+
+
+def snapshot_candidate_rows(filters: dict):
+    """
+        This function returns search response rows using the snapshot for filtering
+        Args:
+            filters: dict from build_candidate_search_filters
+        Returns:
+            candidates_response: list of dict in id order, or None when the ORM must be used
+    """
+    ids = snapshot_candidate_ids(filters)
+    if ids is None:
+        return None
+    rows = fetch_candidate_rows(ids)
+    return [rows[candidate_id] for candidate_id in ids if candidate_id in rows]
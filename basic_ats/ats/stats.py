@@ -0,0 +1,156 @@
+import math
+from collections import Counter
+from django.conf import settings
+from django.db.models import Avg, Count, F, FloatField, IntegerField, Max, Min, Window
+from django.db.models.functions import Cast, RowNumber
+
+
+SALARY_LOOKUP = "expected_salary"
+EXPERIENCE_LOOKUP = "years_of_exp"
+PERCENTILES = (25, 50, 75, 90, 99)
+
+
+def count_by(candidates, field: str) -> dict:
+    """
+        This function counts candidates per value of a field with one GROUP BY query
+        Args:
+            candidates: filtered Candidate queryset
+            field: field to group by
+        Returns:
+            counts: dict of value -> count
+    """
+    return dict(candidates.order_by().values_list(field).annotate(count=Count("id")))
+
+
+def histogram(candidates, lookup: str, width) -> dict:
+    """
+        This function counts candidates per bucket of a numeric field with one GROUP BY query
+        Args:
+            candidates: filtered Candidate queryset
+            lookup: numeric field lookup
+            width: bucket width, buckets are [n * width, (n + 1) * width)
+        Returns:
+            counts: dict of bucket start -> count, ascending
+    """
+    rows = candidates.order_by().annotate(bucket=bucket_of(lookup, width)).values_list("bucket").annotate(
+        count=Count("id"))
+    return dict(sorted(rows))
+
+
+def bucket_of(lookup: str, width):
+    """
+        This function returns the SQL expression of the bucket start of a numeric field
+        Args:
+            lookup: numeric field lookup
+            width: bucket width, buckets are [n * width, (n + 1) * width)
+        Returns:
+            expression
+    """
+    if isinstance(width, bool) or not isinstance(width, (int, float)) or width <= 0:
+        raise ValueError(f"{width} is an invalid bucket width.")
+    return Cast(F(lookup) / width, IntegerField()) * width
+
+
+def distribution(candidates, lookup: str, total: int) -> dict:
+    """
+        This function computes min, max, mean and nearest-rank percentiles of a numeric field
+        with one query: rows are numbered in column order with ROW_NUMBER() and only the rows
+        at the percentile ranks are returned, min, max and mean come from window aggregates.
+        Args:
+            candidates: filtered Candidate queryset
+            lookup: numeric field lookup
+            total: number of candidates in the queryset
+        Returns:
+            summary: dict
+    """
+    summary = {"min": None, "max": None, "mean": None, **{f"p{pct}": None for pct in PERCENTILES}}
+    if not total:
+        return summary
+    # nearest rank: the smallest value with at least pct% of the rows at or below it
+    ranks = {pct: max(math.ceil(pct / 100 * total), 1) for pct in PERCENTILES}
+    rows = candidates.order_by().annotate(
+        # ordered as float: Django wraps a decimal ORDER BY list in CAST(... AS NUMERIC) on SQLite
+        rank=Window(RowNumber(), order_by=Cast(lookup, FloatField()).asc()),
+        column_min=Window(Min(lookup)),
+        column_max=Window(Max(lookup)),
+        column_mean=Window(Avg(lookup)),
+    ).filter(rank__in=set(ranks.values())).values_list("rank", lookup, "column_min", "column_max", "column_mean")
+    values = {}
+    for rank, value, summary["min"], summary["max"], summary["mean"] in rows:
+        values[rank] = value
+    for pct, rank in ranks.items():
+        summary[f"p{pct}"] = values.get(rank)
+    return summary
+
+
+def candidate_stats(candidates, age_bucket, years_of_exp_bucket) -> dict:
+    """
+        This function aggregates a filtered candidate set in the database
+        Args:
+            candidates: filtered Candidate queryset
+            age_bucket: width of the age histogram buckets
+            years_of_exp_bucket: width of the years_of_exp histogram buckets
+        Returns:
+            stats: dict of counts, distributions and histograms
+    """
+    by_status = count_by(candidates, "status")
+    total = sum(by_status.values())
+    return {
+        "total": total,
+        "by_status": by_status,
+        "by_gender": count_by(candidates, "gender"),
+        "expected_salary": distribution(candidates, SALARY_LOOKUP, total),
+        "years_of_exp": distribution(candidates, EXPERIENCE_LOOKUP, total),
+        "age_histogram": histogram(candidates, "age", age_bucket),
+        "years_of_exp_histogram": histogram(candidates, EXPERIENCE_LOOKUP, years_of_exp_bucket),
+    }
+
+
+def get_facet_buckets(data: dict):
+    """
+        This function reads the facets option of a search request
+        Args:
+            data: search request body
+        Returns:
+            buckets: dict of age_bucket and years_of_exp_bucket widths, None when facets are not requested
+    """
+    if not data.get("facets"):
+        return None
+    if data.get("stream"):
+        raise ValueError("facets cannot be combined with stream.")
+    return {
+        "age_bucket": data.get("age_bucket", settings.ATS_STATS_AGE_BUCKET),
+        "years_of_exp_bucket": data.get("years_of_exp_bucket", settings.ATS_STATS_YEARS_OF_EXP_BUCKET),
+    }
+
+
+def candidate_facets(candidates, age_bucket, years_of_exp_bucket) -> dict:
+    """
+        This function counts a filtered candidate set per status, gender, age band and experience band.
+        One GROUP BY over the four columns returns at most a few hundred groups, which are summed
+        into each facet in Python.
+        Args:
+            candidates: filtered Candidate queryset
+            age_bucket: width of the age bands
+            years_of_exp_bucket: width of the experience bands
+        Returns:
+            facets: dict of facet -> {value or band start: count}, bands ascending
+    """
+    groups = candidates.order_by().annotate(
+        age_band=bucket_of("age", age_bucket),
+        years_of_exp_band=bucket_of(EXPERIENCE_LOOKUP, years_of_exp_bucket),
+    ).values_list("status", "gender", "age_band", "years_of_exp_band").annotate(count=Count("id"))
+
+    by_status, by_gender, by_age, by_years_of_exp = Counter(), Counter(), Counter(), Counter()
+    for candidate_status, gender, age_band, years_of_exp_band, count in groups:
+        by_status[candidate_status] += count
+        by_gender[gender] += count
+        by_age[age_band] += count
+        by_years_of_exp[years_of_exp_band] += count
+    return {
+        "total": sum(by_status.values()),
+        "status": dict(by_status),
+        "gender": dict(by_gender),
+        "age": dict(sorted(by_age.items())),
+        "years_of_exp": dict(sorted(by_years_of_exp.items())),
+    }
@@ -0,0 +1,136 @@
+import random
+from contextlib import contextmanager
+from django.conf import settings
+from .importer import insert_candidate_batch
+from .models import Candidate, Gender
+
+
+FIRST_NAMES = ["John", "Jane", "Rahul", "Priya", "Amit", "Sara", "David", "Maria", "Arjun", "Neha",
+               "Michael", "Aisha", "Vikram", "Emma", "Karan", "Olivia", "Rohan", "Sofia", "Ravi", "Anita"]
+LAST_NAMES = ["Smith", "Doe", "Sharma", "Patel", "Kumar", "Singh", "Brown", "Garcia", "Gupta", "Khan",
+              "Wilson", "Mehta", "Taylor", "Rao", "Lee", "Iyer", "Martin", "Das", "Clark", "Nair"]
+GENDERS = [Gender.MALE, Gender.FEMALE, Gender.OTHERS]
+# stored gender -> value accepted by the create endpoints
+REQUEST_GENDERS = {Gender.MALE: "Male", Gender.FEMALE: "Female", Gender.OTHERS: "Other"}
+
+# shapes of the generated columns; uniform is what every benchmark used so far
+NAME_DISTRIBUTIONS = ("uniform", "zipf")
+SALARY_DISTRIBUTIONS = ("uniform", "lognormal")
+AGE_DISTRIBUTIONS = ("uniform", "normal")
+# zipf: the k-th most common name is drawn with weight 1/k, as in real name frequency tables
+ZIPF_WEIGHTS = [1 / rank for rank in range(1, len(FIRST_NAMES) + 1)]
+
+
+def random_name(rng: random.Random, distribution: str) -> str:
+    if distribution == "zipf":
+        return f"{rng.choices(FIRST_NAMES, ZIPF_WEIGHTS)[0]} {rng.choices(LAST_NAMES, ZIPF_WEIGHTS)[0]}"
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_salary(rng: random.Random, distribution: str) -> int:
+    if distribution == "lognormal":
+        # median 80k with a long tail of senior salaries, rounded to 1000
+        return min(max(int(round(rng.lognormvariate(11.29, 0.5), -3)), 20000), 1000000)
+    return rng.randrange(20000, 300000, 1000)
+
+
+def random_age(rng: random.Random, distribution: str) -> int:
+    if distribution == "normal":
+        return min(max(round(rng.gauss(32, 8)), 18), 65)
+    return rng.randint(20, 60)
+
+
+def generate_candidate_payloads(count: int, seed: int = 0, names: str = "uniform", salaries: str = "uniform",
+                                ages: str = "uniform"):
+    """
+        This function yields deterministic candidate create payloads
+        Args:
+            count: number of payloads
+            seed: random seed
+            names: one of NAME_DISTRIBUTIONS
+            salaries: one of SALARY_DISTRIBUTIONS, for the current salary
+            ages: one of AGE_DISTRIBUTIONS
+        Returns:
+            generator of dict
+    """
+    for value, choices in ((names, NAME_DISTRIBUTIONS), (salaries, SALARY_DISTRIBUTIONS), (ages, AGE_DISTRIBUTIONS)):
+        if value not in choices:
+            raise ValueError(f"{value} is an invalid distribution. Add from choices {list(choices)}")
+    rng = random.Random(seed)
+    for i in range(count):
+        years_of_exp = round(rng.uniform(0, 25), 1)
+        current_salary = random_salary(rng, salaries)
+        yield {
+            "name": random_name(rng, names),
+            "age": random_age(rng, ages),
+            "gender": rng.choice(GENDERS),
+            # distinct people per seed, so that payloads of different seeds are not deduplicated
+            "phone_number": str(6000000000 + seed * 10000000 + i),
+            "email": f"candidate{i}@example.com" if seed == 0 else f"candidate{seed}.{i}@example.com",
+            "years_of_exp": years_of_exp,
+            "current_salary": current_salary,
+            "expected_salary": current_salary + rng.randrange(0, 100000, 1000),
+        }
+
+
+def as_request_payload(payload: dict) -> dict:
+    """
+        This function converts a generated payload to the form the create endpoints take
+        Args:
+            payload: dict from generate_candidate_payloads
+        Returns:
+            payload: dict with a display gender and an integer phone number
+    """
+    return dict(payload, gender=REQUEST_GENDERS[payload["gender"]], phone_number=int(payload["phone_number"]))
+
+
+def seed_candidates(count: int, seed: int = 0, batch_size: int = 1000, index_names: bool = True,
+                    **distributions) -> list:
+    """
+        This function inserts synthetic candidates with batched inserts
+        Args:
+            count: number of candidates
+            seed: random seed
+            batch_size: rows inserted per transaction
+            index_names: False to skip the name search indexes
+            distributions: names, salaries and ages, see generate_candidate_payloads
+        Returns:
+            ids: ids of the inserted candidates
+    """
+    payloads = generate_candidate_payloads(count, seed, **distributions)
+    ids = []
+    while len(ids) < count:
+        batch = [next(payloads) for _ in range(min(batch_size, count - len(ids)))]
+        ids.extend(candidate.id for candidate in insert_candidate_batch(batch, index_names))
+    return ids
+
+
+def delete_candidates(ids: list) -> None:
+    """
+        This function deletes candidates by id, one query per ATS_ID_CHUNK_SIZE ids
+        Args:
+            ids: candidate ids
+    """
+    chunk_size = settings.ATS_ID_CHUNK_SIZE
+    for start in range(0, len(ids), chunk_size):
+        Candidate.objects.filter(id__in=ids[start:start + chunk_size]).delete()
+
+
+@contextmanager
+def temporary_candidates(count: int, seed: int = 0, **distributions):
+    """
+        This context manager seeds synthetic candidates and deletes them on exit.
+        Other candidates, including ones created meanwhile, are left alone.
+        Args:
+            count: number of candidates
+            seed: random seed
+            distributions: names, salaries and ages, see generate_candidate_payloads
+        Returns:
+            ids: list of seeded candidate ids
+    """
+    ids = []
+    try:
+        ids = seed_candidates(count, seed, **distributions)
+        yield ids
+    finally:
+        delete_candidates(ids)
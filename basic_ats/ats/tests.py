@@ -1,3 +1,890 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import api_settings as jwt_api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import CachedJWTAuthentication, token_cache, user_cache
+from .cache import reset_cache_stats
+from .instrumentation import registry
+from .routers import ReadReplicaRouter, pinned_to_primary, replica_reads
+from .jobs import JOB_HANDLERS, claim_job, enqueue_job, requeue_stale_jobs, run_job, run_next_job
+from .renderers import FastJSONRenderer, RenderedJSON, render_candidate_rows
+from .models import BackgroundJob, BackgroundJobState, Candidate, CandidateNameToken, Gender
+from .snapshot import CandidateSnapshot
+from .stats import candidate_stats
+from .synthetic import as_request_payload, generate_candidate_payloads
+from .utils import candidate_values, prepare_candidate_response_json, validate_ceate_candidate_request_body, verify_gender
 
-# Create your tests here.
+
+def create_candidate(name="John Doe", age=30, years_of_exp=5, expected_salary=60000, **kwargs):
+    fields = {
+        "name": name,
+        "age": age,
+        "gender": "MALE",
+        "phone_number": "1234567890",
+        "email": "john.doe@example.com",
+    }
+    fields.update(kwargs)
+    return Candidate.objects.create(years_of_exp=years_of_exp, current_salary=50000,
+                                    expected_salary=expected_salary, **fields)
+
+
+class AtsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recruiter", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        reset_cache_stats()
+        token_cache.clear()
+        user_cache.clear()
+
+
+class CandidateResponseTests(AtsTestCase):
+    def test_serialization_query_count_is_constant(self):
+        for i in range(3):
+            create_candidate(name=f"Candidate {i}")
+        with self.assertNumQueries(1):
+            small = prepare_candidate_response_json(Candidate.objects.all())
+
+        for i in range(3, 30):
+            create_candidate(name=f"Candidate {i}")
+        with self.assertNumQueries(1):
+            large = prepare_candidate_response_json(Candidate.objects.all())
+
+        self.assertEqual(len(small), 3)
+        self.assertEqual(len(large), 30)
+        self.assertEqual(large[0]["years_of_exp"], 5)
+
+    def test_get_candidate_response_shape(self):
+        candidate = create_candidate()
+        response = self.client.get(reverse("get_candidate", args=[candidate.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()[0].keys()), [
+            "name", "age", "gender", "phone_number", "email", "years_of_exp",
+            "current_salary", "expected_salary", "status", "reason",
+        ])
+
+    def test_search_by_name_orders_by_score(self):
+        create_candidate(name="John Smith")
+        create_candidate(name="John Doe")
+        create_candidate(name="Jane Roe")
+        response = self.client.post(reverse("search_by_name"), {"name": "John Doe"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.json()], ["John Doe", "John Smith"])
+
+
+class SearchCandidatePaginationTests(AtsTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            create_candidate(name=f"Candidate {i}")
+
+    def test_cursor_walks_all_pages(self):
+        names = []
+        payload = {"page_size": 2}
+        while True:
+            response = self.client.post(reverse("search_candidate"), payload, format="json")
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            names.extend(row["name"] for row in page["results"])
+            if not page["next_cursor"]:
+                break
+            payload = {"page_size": 2, "cursor": page["next_cursor"]}
+        self.assertEqual(names, [f"Candidate {i}" for i in range(5)])
+
+    def test_invalid_cursor(self):
+        response = self.client.post(reverse("search_candidate"), {"cursor": "nope"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_ndjson(self):
+        response = self.client.post(reverse("search_candidate"), {"stream": True}, format="json")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["name"], "Candidate 0")
+
+
+class SearchCandidateProjectionTests(AtsTestCase):
+    def test_order_by_fields_and_limit(self):
+        for i, salary in enumerate((70000, 90000, 80000)):
+            create_candidate(name=f"Candidate {i}", expected_salary=salary)
+        payload = {"order_by": "-salary", "fields": ["name", "expected_salary"], "limit": 2}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("search_candidate"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {"name": "Candidate 1", "expected_salary": 90000},
+            {"name": "Candidate 2", "expected_salary": 80000},
+        ])
+
+    def test_invalid_options(self):
+        for payload in ({"fields": ["salary"]}, {"order_by": "name"}, {"limit": 0},
+                        {"order_by": "age", "page_size": 2}):
+            response = self.client.post(reverse("search_candidate"), payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class NameIndexTests(AtsTestCase):
+    def test_index_follows_renames(self):
+        candidate = create_candidate(name="John Doe")
+        self.assertEqual(sorted(candidate.name_tokens.values_list("token", flat=True)), ["doe", "john"])
+        candidate.name = "Johnny Walker"
+        candidate.save()
+        self.assertEqual(sorted(candidate.name_tokens.values_list("token", flat=True)), ["johnny", "walker"])
+
+    def test_search_by_name_query_count_is_constant(self):
+        for i in range(20):
+            create_candidate(name=f"John Number{i}")
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse("search_by_name"), {"name": "john"}, format="json")
+        self.assertEqual(len(response.json()), 20)
+
+    def test_rebuild_name_index(self):
+        candidate = create_candidate(name="Jane Roe")
+        CandidateNameToken.objects.all().delete()
+        call_command("rebuild_name_index", stdout=StringIO())
+        self.assertEqual(sorted(candidate.name_tokens.values_list("token", flat=True)), ["jane", "roe"])
+
+    def test_fuzzy_search_tolerates_typos(self):
+        create_candidate(name="John Smith")
+        create_candidate(name="Jon Smth")
+        create_candidate(name="Priya Patel")
+        response = self.client.post(reverse("search_by_name"), {"name": "Jon Smth", "fuzzy": True}, format="json")
+        self.assertEqual([row["name"] for row in response.json()], ["Jon Smth", "John Smith"])
+
+        response = self.client.post(reverse("search_by_name"), {"name": "jon smth", "fuzzy": True, "top_k": 1,
+                                                                "threshold": 0.9}, format="json")
+        self.assertEqual([row["name"] for row in response.json()], ["Jon Smth"])
+
+    def test_fuzzy_search_ranks_short_similar_names_first(self):
+        # longer names containing the query share all its trigrams but are less similar
+        for i in range(15):
+            create_candidate(name=f"Jon Q{i}")
+        create_candidate(name="Jon")
+        response = self.client.post(reverse("search_by_name"), {"name": "Jon", "fuzzy": True, "top_k": 1},
+                                    format="json")
+        self.assertEqual([row["name"] for row in response.json()], ["Jon"])
+
+
+class BulkImportTests(AtsTestCase):
+    def payload(self, **kwargs):
+        data = {
+            "name": "John Doe", "age": 30, "gender": "Male", "phone_number": 1234567890,
+            "email": "john.doe@example.com", "years_of_exp": 5, "current_salary": 50000,
+            "expected_salary": 60000,
+        }
+        data.update(kwargs)
+        return data
+
+    def test_json_array_reports_row_errors(self):
+        rows = [self.payload(), self.payload(age="thirty"), self.payload(name="Jane Roe", email="jane@example.com")]
+        response = self.client.post(reverse("create_candidate_bulk"), rows, format="json")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result["created"], 2)
+        self.assertEqual([error["index"] for error in result["errors"]], [1])
+        self.assertEqual(sorted(Candidate.objects.values_list("name", flat=True)), ["Jane Roe", "John Doe"])
+        self.assertEqual(CandidateNameToken.objects.filter(token="jane").count(), 1)
+
+    def test_csv_body(self):
+        body = (
+            "name,age,gender,phone_number,email,years_of_exp,current_salary,expected_salary\n"
+            "John Doe,30,Male,1234567890,john.doe@example.com,5,50000,60000\n"
+            "Jane Roe,28,Female,12345,jane@example.com,3.5,40000,45000\n"
+        )
+        response = self.client.post(reverse("create_candidate_bulk"), body, content_type="text/csv")
+        result = response.json()
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["errors"][0]["index"], 1)
+
+    def test_duplicates_within_and_across_imports(self):
+        rows = [self.payload(), self.payload(email="John.Doe@Example.com", name="Johnny Doe")]
+        first = self.client.post(reverse("create_candidate_bulk") + "?dedup_policy=merge", rows, format="json").json()
+        self.assertEqual(first["created"], 1)
+        self.assertEqual(first["duplicates"], [{"index": 1, "id": first["ids"][0]}])
+        self.assertEqual(Candidate.objects.get().name, "Johnny Doe")
+
+        second = self.client.post(reverse("create_candidate_bulk") + "?dedup_policy=reject", rows[:1],
+                                  format="json").json()
+        self.assertEqual(second["created"], 0)
+        self.assertEqual(second["errors"][0]["index"], 0)
+
+
+class DedupTests(AtsTestCase):
+    payload = {
+        "name": "John Doe", "age": 30, "gender": "Male", "phone_number": 1234567890,
+        "email": "john.doe@example.com", "years_of_exp": 5, "current_salary": 50000, "expected_salary": 60000,
+    }
+
+    def test_create_policies(self):
+        url = reverse("create_candidate")
+        candidate_id = self.client.post(url, self.payload, format="json").json()["id"]
+
+        response = self.client.post(url, dict(self.payload, email="JOHN.DOE@example.com"), format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], candidate_id)
+
+        response = self.client.post(url + "?dedup_policy=reject", self.payload, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["id"], candidate_id)
+
+        response = self.client.post(url + "?dedup_policy=merge", dict(self.payload, expected_salary=90000),
+                                    format="json")
+        self.assertEqual(response.json()["id"], candidate_id)
+        self.assertEqual(Candidate.objects.get().expected_salary, 90000)
+
+    def test_dedupe_command_merges_into_oldest(self):
+        keeper = create_candidate(name="John Doe", expected_salary=60000)
+        create_candidate(name="Johnny Doe", expected_salary=70000, email="John.Doe@example.com")
+        create_candidate(name="Jane Roe", email="jane@example.com")
+
+        call_command("dedupe_candidates", "--dry-run", stdout=StringIO())
+        self.assertEqual(Candidate.objects.count(), 3)
+
+        out = StringIO()
+        call_command("dedupe_candidates", "--batch-size", "2", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["duplicates_removed"], 1)
+        keeper.refresh_from_db()
+        self.assertEqual((keeper.name, keeper.expected_salary), ("Johnny Doe", 70000))
+        self.assertEqual(Candidate.objects.filter(dedup_key__isnull=True).count(), 0)
+        self.assertEqual(CandidateNameToken.objects.filter(token="johnny").count(), 1)
+
+    def test_dedupe_command_keeps_legacy_candidate_over_newer_keyed_one(self):
+        legacy = create_candidate(name="John Doe", age=30, status="SHORTLISTED", reason="great")
+        # re-application after the key existed, the legacy row has none so a new keyed row is created
+        response = self.client.post(reverse("create_candidate"), dict(self.payload, name="John A Doe", age=31),
+                                    format="json")
+        self.assertNotEqual(response.json()["id"], legacy.id)
+
+        call_command("dedupe_candidates", stdout=StringIO())
+        candidate = Candidate.objects.get()
+        self.assertEqual(candidate.id, legacy.id)
+        self.assertIsNotNone(candidate.dedup_key)
+        self.assertEqual((candidate.name, candidate.age), ("John A Doe", 31))
+        self.assertEqual((candidate.status, candidate.reason), ("SHORTLISTED", "great"))
+
+
+class ValidationTests(TestCase):
+    def test_collects_all_errors(self):
+        validation_status, error = validate_ceate_candidate_request_body({"name": "", "age": -1})
+        self.assertFalse(validation_status)
+        self.assertIn("'years_of_exp' is a required property", error)
+        self.assertIn("-1 is less than the minimum of 0", error)
+        self.assertIn("'' should be non-empty", error)
+
+    def test_synthetic_payloads_are_valid_requests(self):
+        for payload in generate_candidate_payloads(30, seed=1, names="zipf", salaries="lognormal", ages="normal"):
+            payload = as_request_payload(payload)
+            self.assertEqual(validate_ceate_candidate_request_body(payload), (True, ""))
+
+    def test_verify_gender_accepts_schema_choices(self):
+        self.assertEqual(verify_gender("Other"), Gender.OTHERS)
+        self.assertEqual(verify_gender("others"), Gender.OTHERS)
+        self.assertEqual(verify_gender("Female"), Gender.FEMALE)
+        with self.assertRaises(ValueError):
+            verify_gender("unknown")
+
+
+class ResponseCacheTests(AtsTestCase):
+    def test_get_candidate_invalidated_by_put(self):
+        candidate = create_candidate()
+        url = reverse("get_candidate", args=[candidate.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()[0]["status"], "APPLIED")
+
+        self.client.put(reverse("update_candidate"), {"id": candidate.id, "status": "Shortlisted"}, format="json")
+        self.assertEqual(self.client.get(url).json()[0]["status"], "SHORTLISTED")
+        self.assertEqual(self.client.get(reverse("cache_stats")).json(), {
+            "candidate_hits": 1, "candidate_misses": 2, "search_hits": 0, "search_misses": 0,
+        })
+
+    def test_missing_candidate_not_cached(self):
+        url = reverse("get_candidate", args=[1000])
+        self.assertEqual(self.client.get(url).json(), [])
+        create_candidate(id=1000)
+        self.assertEqual(self.client.get(url).json()[0]["name"], "John Doe")
+
+    def test_search_invalidated_by_create(self):
+        create_candidate(age=30)
+        payload = {"age_min": 25, "age_max": 35}
+        self.assertEqual(len(self.client.post(reverse("search_candidate"), payload, format="json").json()), 1)
+        self.assertEqual(len(self.client.post(reverse("search_candidate"), payload, format="json").json()), 1)
+        self.client.post(reverse("create_candidate"), {
+            "name": "Jane Roe", "age": 28, "gender": "Female", "phone_number": 1234567890,
+            "email": "jane@example.com", "years_of_exp": 3, "current_salary": 40000, "expected_salary": 45000,
+        }, format="json")
+        self.assertEqual(len(self.client.post(reverse("search_candidate"), payload, format="json").json()), 2)
+
+
+class StatusTransitionTests(AtsTestCase):
+    def test_batch_transition(self):
+        applied = create_candidate()
+        rejected = create_candidate(status="REJECTED")
+        # savepoint, UPDATE, SELECT, release
+        with self.assertNumQueries(4):
+            response = self.client.put(reverse("update_candidate_bulk"), {
+                "ids": [applied.id, rejected.id, 999], "status": "shortlisted", "reason": "Good fit",
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result["transitioned"], [applied.id])
+        self.assertEqual(result["already_final"], {str(rejected.id): "REJECTED"})
+        self.assertEqual(result["not_found"], [999])
+        applied.refresh_from_db()
+        self.assertEqual((applied.status, applied.reason), ("SHORTLISTED", "Good fit"))
+
+    def test_non_integer_ids_are_refused(self):
+        candidate = create_candidate()
+        for ids in ([True], ["%d" % candidate.id], [1.0]):
+            response = self.client.put(reverse("update_candidate_bulk"), {"ids": ids, "status": "Rejected"},
+                                       format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "ids must be integers")
+        response = self.client.put(reverse("update_candidate"), {"id": True, "status": "Rejected"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, "APPLIED")
+
+    def test_single_update_of_final_candidate(self):
+        candidate = create_candidate(status="SHORTLISTED")
+        response = self.client.put(reverse("update_candidate"), {"id": candidate.id, "status": "Rejected"},
+                                   format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Status cannot be updated. Candidate is already SHORTLISTED")
+
+
+class CandidateStatsTests(AtsTestCase):
+    def test_stats_honor_search_filters(self):
+        create_candidate(age=24, years_of_exp=1, expected_salary=30000)
+        create_candidate(age=31, years_of_exp=6.5, expected_salary=70000, status="SHORTLISTED")
+        create_candidate(age=33, years_of_exp=9, expected_salary=90000, gender="FEMALE")
+        create_candidate(age=50, years_of_exp=20, expected_salary=150000)
+
+        response = self.client.post(reverse("search_candidate_stats"), {
+            "age_min": 20, "age_max": 40, "age_bucket": 10, "years_of_exp_bucket": 5,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["by_status"], {"APPLIED": 2, "SHORTLISTED": 1})
+        self.assertEqual(stats["by_gender"], {"MALE": 2, "FEMALE": 1})
+        self.assertEqual(stats["expected_salary"]["p50"], 70000)
+        self.assertEqual(stats["years_of_exp"]["max"], 9)
+        self.assertEqual(stats["age_histogram"], {"20": 1, "30": 2})
+        self.assertEqual(stats["years_of_exp_histogram"], {"0": 1, "5": 2})
+
+    def test_nearest_rank_percentiles_in_one_query_per_column(self):
+        for years in range(10, 0, -1):
+            create_candidate(years_of_exp=years, expected_salary=years * 1000)
+        # status, gender, one per distribution and one per histogram
+        with self.assertNumQueries(6):
+            stats = candidate_stats(Candidate.objects.all(), 5, 2)
+        self.assertEqual(stats["years_of_exp"], {
+            "min": 1, "max": 10, "mean": 5.5, "p25": 3, "p50": 5, "p75": 8, "p90": 9, "p99": 10,
+        })
+        self.assertEqual(stats["expected_salary"]["p25"], 3000)
+        self.assertEqual(candidate_stats(Candidate.objects.none(), 5, 2)["years_of_exp"]["p50"], None)
+
+    def test_search_facets(self):
+        create_candidate(age=24, years_of_exp=1, expected_salary=30000)
+        create_candidate(age=31, years_of_exp=6.5, expected_salary=70000, status="SHORTLISTED")
+        create_candidate(age=33, years_of_exp=9, expected_salary=90000, gender="FEMALE")
+        create_candidate(age=50, years_of_exp=20, expected_salary=150000)
+
+        payload = {"age_min": 20, "age_max": 40, "facets": True, "age_bucket": 10, "years_of_exp_bucket": 5,
+                   "fields": ["age"], "order_by": "age"}
+        # the results and one grouped query for every facet
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse("search_candidate"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "results": [{"age": 24}, {"age": 31}, {"age": 33}],
+            "facets": {
+                "total": 3,
+                "status": {"APPLIED": 2, "SHORTLISTED": 1},
+                "gender": {"MALE": 2, "FEMALE": 1},
+                "age": {"20": 1, "30": 2},
+                "years_of_exp": {"0": 1, "5": 2},
+            },
+        })
+
+        page = self.client.post(reverse("search_candidate"), {"facets": True, "page_size": 2}, format="json").json()
+        self.assertEqual(len(page["results"]), 2)
+        self.assertEqual(page["facets"]["total"], 4)
+        response = self.client.post(reverse("search_candidate"), {"facets": True, "stream": True}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncViewTests(AtsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auth = {"headers": {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}}
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse("async_get_candidate", args=[1]))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_create_get_and_search(self):
+        response = await self.async_client.post(reverse("async_create_candidate"), {
+            "name": "Jane Roe", "age": 28, "gender": "Female", "phone_number": 1234567890,
+            "email": "jane@example.com", "years_of_exp": 3, "current_salary": 40000, "expected_salary": 45000,
+        }, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        candidate_id = response.json()["id"]
+
+        response = await self.async_client.get(reverse("async_get_candidate", args=[candidate_id]), **self.auth)
+        self.assertEqual(response.json()[0]["expected_salary"], 45000)
+
+        response = await self.async_client.post(reverse("async_search_candidate"), {"age_min": 20, "age_max": 30},
+                                                content_type="application/json", **self.auth)
+        self.assertEqual([row["name"] for row in response.json()], ["Jane Roe"])
+
+        response = await self.async_client.post(reverse("async_search_candidate"), {"facets": True},
+                                                content_type="application/json", **self.auth)
+        self.assertEqual(response.json()["facets"]["gender"], {"FEMALE": 1})
+
+        response = await self.async_client.post(reverse("async_search_by_name"), {"name": "jane roe"},
+                                                content_type="application/json", **self.auth)
+        self.assertEqual([row["name"] for row in response.json()], ["Jane Roe"])
+
+        response = await self.async_client.put(reverse("async_update_candidate"),
+                                               {"id": candidate_id, "status": "Rejected"},
+                                               content_type="application/json", **self.auth)
+        self.assertEqual(response.json()["status"], "REJECTED")
+
+    async def test_revoked_token_is_rejected_like_the_sync_views(self):
+        # simplejwt modules keep the api_settings object they imported, so it is patched in place
+        with patch.object(jwt_api_settings, "CHECK_REVOKE_TOKEN", True):
+            headers = {"headers": {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}}
+            self.user.set_password("changed")
+            await self.user.asave()
+            response = await self.async_client.get(reverse("async_get_candidate", args=[1]), **headers)
+            self.assertEqual(response.status_code, 401)
+            response = await self.async_client.get(reverse("get_candidate", args=[1]), **headers)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_fuzzy_search_by_name_matches_the_sync_view(self):
+        for name in ("John Smith", "Jon Smth", "Priya Patel"):
+            await sync_to_async(create_candidate)(name=name)
+        for payload in ({"name": "Jon Smth", "fuzzy": True}, {"name": "jon smth", "fuzzy": True, "top_k": 1,
+                                                              "threshold": 0.9}):
+            response = await self.async_client.post(reverse("async_search_by_name"), payload,
+                                                    content_type="application/json", **self.auth)
+            expected = await sync_to_async(self.client.post)(reverse("search_by_name"), payload, format="json")
+            self.assertEqual(response.json(), expected.json())
+        response = await self.async_client.post(reverse("async_search_by_name"), {"name": "Jon", "fuzzy": True,
+                                                "top_k": 0}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_get_uses_the_response_cache(self):
+        candidate = await sync_to_async(create_candidate)()
+        url = reverse("async_get_candidate", args=[candidate.id])
+        response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.json()[0]["name"], "John Doe")
+        await Candidate.objects.filter(id=candidate.id).aupdate(name="Changed Outside")
+        response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.json()[0]["name"], "John Doe")
+        # the sync view reads the same entry
+        self.assertEqual((await sync_to_async(self.client.get)(reverse("get_candidate", args=[candidate.id])))
+                         .json()[0]["name"], "John Doe")
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                                           "LOCATION": "ats_test_cache"}})
+    async def test_writes_invalidate_a_database_cache(self):
+        await sync_to_async(call_command)("createcachetable", verbosity=0)
+        response = await self.async_client.post(reverse("async_create_candidate"), {
+            "name": "Jane Roe", "age": 28, "gender": "Female", "phone_number": 1234567890,
+            "email": "jane@example.com", "years_of_exp": 3, "current_salary": 40000, "expected_salary": 45000,
+        }, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.put(reverse("async_update_candidate"),
+                                               {"id": response.json()["id"], "status": "Rejected"},
+                                               content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ATS_SNAPSHOT_ENABLED=True)
+class CandidateSnapshotTests(AtsTestCase):
+    def test_snapshot_matches_orm(self):
+        snapshot = CandidateSnapshot()
+        candidates = [
+            create_candidate(age=25, years_of_exp=2, expected_salary=40000),
+            create_candidate(age=32, years_of_exp=8, expected_salary=90000, phone_number="9999999999"),
+            create_candidate(age=45, years_of_exp=20, expected_salary=150000),
+        ]
+        snapshot.refresh()
+        for filters in (
+            {"age__range": (20, 40)},
+            {"expected_salary__range": (40000, 90000), "years_of_exp__gte": 5},
+            {"phone_number": 9999999999, "age__range": (30, 35)},
+        ):
+            expected = list(Candidate.objects.filter(**filters).order_by("id").values_list("id", flat=True))
+            self.assertEqual(snapshot.filter_ids(filters), expected)
+
+        Candidate.objects.filter(id=candidates[0].id).update(age=50, updated_at=timezone.now())
+        # the changed row, plus the rows stamped within the overlap window
+        self.assertEqual(snapshot.refresh(), 3)
+        self.assertEqual(snapshot.filter_ids({"age__range": (49, 51)}), [candidates[0].id])
+
+    def test_refresh_picks_up_rows_committed_late(self):
+        snapshot = CandidateSnapshot()
+        loaded = create_candidate(age=25)
+        snapshot.refresh()
+        # stamped before the loaded row, committed after the refresh
+        late = create_candidate(age=26)
+        Candidate.objects.filter(id=late.id).update(updated_at=loaded.updated_at - timedelta(seconds=1))
+        snapshot.refresh()
+        self.assertEqual(snapshot.filter_ids({"age__range": (20, 30)}), [loaded.id, late.id])
+
+    def test_search_uses_snapshot_after_writes(self):
+        create_candidate(age=30)
+        payload = {"age_min": 25, "age_max": 35}
+        self.assertEqual(len(self.client.post(reverse("search_candidate"), payload, format="json").json()), 1)
+        self.client.post(reverse("create_candidate"), {
+            "name": "Jane Roe", "age": 28, "gender": "Female", "phone_number": 1234567890,
+            "email": "jane@example.com", "years_of_exp": 3, "current_salary": 40000, "expected_salary": 45000,
+        }, format="json")
+        self.assertEqual(len(self.client.post(reverse("search_candidate"), payload, format="json").json()), 2)
+
+
+class RequestMetricsTests(AtsTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_metrics_record_requests_sql_and_phases(self):
+        candidate = create_candidate()
+        self.client.get(reverse("get_candidate", args=[candidate.id]))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('ats_requests_total{method="GET",route="ats/get/candidate/<int:pk>",status="200"} 1', text)
+        self.assertIn('ats_request_sql_queries_total{method="GET",route="ats/get/candidate/<int:pk>"}', text)
+        self.assertIn('ats_phase_calls_total{endpoint="ats/get/candidate/<int:pk>",phase="serialization"} 1', text)
+
+    def test_serialization_timed_on_every_search_path(self):
+        candidate = create_candidate(name="John Smith")
+        search = reverse("search_candidate")
+        self.client.post(search, {"paginate": True}, format="json")
+        b"".join(self.client.post(search, {"stream": True}, format="json").streaming_content)
+        self.client.post(reverse("search_by_name"), {"name": "John"}, format="json")
+        self.client.post(reverse("get_candidate_bulk"), {"ids": [candidate.id]}, format="json")
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('ats_phase_calls_total{endpoint="ats/search/candidate",phase="serialization"} 2', text)
+        self.assertIn('ats_phase_calls_total{endpoint="ats/search/candidate/by_name",phase="serialization"} 1', text)
+        self.assertIn('ats_phase_calls_total{endpoint="ats/get/candidate/bulk",phase="serialization"} 1', text)
+
+    @override_settings(ATS_METRICS_ALLOWED_IPS=[])
+    def test_metrics_are_local_only(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+    @override_settings(ATS_TRUSTED_PROXIES=["127.0.0.1"])
+    def test_metrics_behind_a_local_proxy_check_the_forwarded_client(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR="203.0.113.7").status_code, 403)
+        # a spoofed left-most entry is ignored, the proxy appends the real peer
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR="127.0.0.1, 203.0.113.7").status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR="::1").status_code, 200)
+
+
+class FastJSONRendererTests(AtsTestCase):
+    def test_renders_decimal_and_datetime(self):
+        candidate = Candidate.objects.get(id=create_candidate().id)
+        content = FastJSONRenderer().render({"salary": candidate.expected_salary, "created_at": candidate.created_at})
+        data = json.loads(content)
+        self.assertEqual(data["salary"], 60000)
+        self.assertTrue(data["created_at"].endswith("Z"))
+
+    def test_direct_rows_match_response_list(self):
+        for i in range(3):
+            create_candidate(name=f"Candidate {i}")
+        candidates = Candidate.objects.order_by("id")
+        content = render_candidate_rows(candidate_values(candidates))
+        self.assertIsInstance(content, RenderedJSON)
+        self.assertEqual(json.loads(content), json.loads(json.dumps(prepare_candidate_response_json(candidates),
+                                                                    default=float)))
+        self.assertEqual(FastJSONRenderer().render(content), bytes(content))
+
+
+class BackgroundJobTests(AtsTestCase):
+    def test_background_bulk_import(self):
+        rows = [BulkImportTests.payload(self), BulkImportTests.payload(self, age="thirty")]
+        response = self.client.post(reverse("create_candidate_bulk") + "?background=true", rows, format="json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+        self.assertFalse(Candidate.objects.exists())
+
+        self.assertEqual(run_next_job("test"), BackgroundJobState.SUCCEEDED)
+        self.assertIsNone(run_next_job("test"))
+        job = self.client.get(reverse("get_job", args=[job_id])).json()
+        self.assertEqual((job["state"], job["progress"], job["attempts"]), (BackgroundJobState.SUCCEEDED, 1, 1))
+        self.assertEqual(job["result"]["created"], 1)
+        self.assertEqual(job["result"]["errors"][0]["index"], 1)
+        self.assertEqual(Candidate.objects.get().name, "John Doe")
+
+    def test_retry_with_backoff_then_fail(self):
+        def failing(payload, progress):
+            raise RuntimeError("boom")
+
+        with patch.dict(JOB_HANDLERS, {"failing": failing}), self.settings(ATS_JOB_RETRY_BACKOFF_SECONDS=60):
+            job = enqueue_job("failing", max_attempts=2)
+            self.assertEqual(run_next_job("test"), BackgroundJobState.QUEUED)
+            job.refresh_from_db()
+            self.assertEqual((job.attempts, job.error), (1, "boom"))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+            # not due until the backoff has passed
+            self.assertIsNone(run_next_job("test"))
+
+            BackgroundJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            self.assertEqual(run_next_job("test"), BackgroundJobState.FAILED)
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts), (BackgroundJobState.FAILED, 2))
+            self.assertIsNotNone(job.finished_at)
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue_job("rebuild_name_index")
+        BackgroundJob.objects.filter(id=job.id).update(state=BackgroundJobState.RUNNING, locked_by="gone",
+                                                       locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(run_next_job("test"), BackgroundJobState.SUCCEEDED)
+
+    def test_stale_jobs_out_of_attempts_fail(self):
+        job = enqueue_job("rebuild_name_index", max_attempts=2)
+        BackgroundJob.objects.filter(id=job.id).update(state=BackgroundJobState.RUNNING, locked_by="gone", attempts=2,
+                                                       locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.state, BackgroundJobState.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(run_next_job("test"))
+
+    def test_expired_run_cannot_update_reclaimed_job(self):
+        job = enqueue_job("rebuild_name_index")
+        first = claim_job("worker")
+        BackgroundJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        requeue_stale_jobs()
+        # reclaimed by another thread of the same worker while the first run goes on
+        second = claim_job("worker")
+        self.assertNotEqual(first[1], second[1])
+        run_job(*first)
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.locked_by), (BackgroundJobState.RUNNING, second[1]))
+        self.assertEqual(run_job(*second), BackgroundJobState.SUCCEEDED)
+
+    def test_enqueue_validation(self):
+        response = self.client.post(reverse("create_job"), {"kind": "rebuild_name_index"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["state"], BackgroundJobState.QUEUED)
+        for payload in ({"kind": "unknown"}, {"kind": "rebuild_name_index", "max_attempts": 0}, {}):
+            self.assertEqual(self.client.post(reverse("create_job"), payload, format="json").status_code, 400)
+        self.assertEqual(self.client.get(reverse("get_job", args=[999])).status_code, 404)
+
+
+class ExportCandidateTests(AtsTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            create_candidate(name=f"Candidate {i}", age=20 + i, email=f"candidate{i}@example.com")
+
+    def test_csv_export_uses_search_filters(self):
+        payload = {"age_min": 21, "age_max": 23, "fields": ["name", "age"], "order_by": "-age"}
+        response = self.client.post(reverse("export_candidate"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="candidates.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows, [["name", "age"], ["Candidate 3", "23"], ["Candidate 2", "22"], ["Candidate 1", "21"]])
+
+    def test_gzipped_ndjson_export(self):
+        payload = {"format": "ndjson", "gzip": True, "limit": 2, "order_by": "age"}
+        response = self.client.post(reverse("export_candidate"), payload, format="json")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)["name"] for line in lines], ["Candidate 0", "Candidate 1"])
+        self.assertEqual(json.loads(lines[0])["expected_salary"], 60000)
+
+    def test_csv_export_escapes_formulas(self):
+        create_candidate(name="=HYPERLINK(\"http://evil\")", age=40, email="@evil.example.com")
+        response = self.client.post(reverse("export_candidate"), {"age_min": 40, "age_max": 40,
+                                                                  "fields": ["name", "age", "email"]}, format="json")
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[1], ["'=HYPERLINK(\"http://evil\")", "40", "'@evil.example.com"])
+
+    def test_invalid_format(self):
+        response = self.client.post(reverse("export_candidate"), {"format": "xlsx"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_background_export(self):
+        with tempfile.TemporaryDirectory() as export_dir, self.settings(ATS_EXPORT_DIR=export_dir):
+            response = self.client.post(reverse("export_candidate") + "?background=true", {"age_min": 20, "age_max": 21},
+                                        format="json")
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(run_next_job("test"), BackgroundJobState.SUCCEEDED)
+            result = BackgroundJob.objects.get(id=response.json()["id"]).result
+            with open(result["path"]) as export_file:
+                self.assertEqual(len(export_file.read().splitlines()), 3)
+
+    def test_background_export_reports_progress(self):
+        reported = []
+        with tempfile.TemporaryDirectory() as export_dir, self.settings(ATS_EXPORT_DIR=export_dir,
+                                                                         ATS_SEARCH_STREAM_CHUNK_SIZE=2):
+            JOB_HANDLERS["export_candidates"]({"search": {"format": "ndjson"}}, reported.append)
+        self.assertEqual(reported, [0.4, 0.8, 1.0])
+
+
+class CachedJWTAuthenticationTests(AtsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.candidate = create_candidate()
+
+    def test_repeated_token_skips_user_query(self):
+        url = reverse("get_candidate", args=[self.candidate.id])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        cache.clear()
+        # only the candidate query is left
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(token_cache.stats["hits"], 1)
+
+    def test_deactivated_user_is_rejected(self):
+        url = reverse("get_candidate", args=[self.candidate.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_entries_expire_with_the_token(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        raw_token = str(token).encode()
+        CachedJWTAuthentication().get_validated_token(raw_token)
+        with patch("ats.authentication.time.time", return_value=token["exp"] + 1):
+            self.assertIsNone(token_cache.get(raw_token))
+
+
+class CandidateMultiGetTests(AtsTestCase):
+    def test_results_keyed_by_id_with_not_found(self):
+        first = create_candidate(name="First")
+        second = create_candidate(name="Second", email="second@example.com")
+        payload = {"ids": [second.id, 999, first.id, second.id], "fields": ["name"]}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("get_candidate_bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "results": {str(second.id): {"name": "Second"}, "999": None, str(first.id): {"name": "First"}},
+            "not_found": [999],
+        })
+
+    @override_settings(ATS_MULTI_GET_MAX_IDS=2, ATS_ID_CHUNK_SIZE=1)
+    def test_limits_and_chunking(self):
+        ids = [create_candidate(email=f"c{i}@example.com").id for i in range(2)]
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse("get_candidate_bulk"), {"ids": ids}, format="json")
+        self.assertEqual(response.json()["results"][str(ids[0])]["expected_salary"], 60000)
+        for payload in ({"ids": [1, 2, 3]}, {"ids": []}, {"ids": ["1"]}, {}):
+            response = self.client.post(reverse("get_candidate_bulk"), payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+
+
+@override_settings(ATS_READ_DATABASES=["replica"])
+class ReadReplicaRoutingTests(TransactionTestCase):
+    # the replica mirrors the test database, it only sees committed rows
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="recruiter", password="secret")
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.candidate = create_candidate()
+        self.replica_queries = []
+        wrapper = lambda execute, sql, params, many, context: self.replica_queries.append(sql) or execute(
+            sql, params, many, context)
+        wrapped = connections["replica"].execute_wrapper(wrapper)
+        wrapped.__enter__()
+        self.addCleanup(wrapped.__exit__, None, None, None)
+
+    def test_reads_go_to_replica_until_the_client_writes(self):
+        payload = {"ids": [self.candidate.id]}
+        self.client.post(reverse("get_candidate_bulk"), payload, format="json")
+        # the user and the candidates
+        self.assertEqual(len(self.replica_queries), 2)
+
+        response = self.client.put(reverse("update_candidate"), {"id": self.candidate.id, "status": "Rejected"},
+                                   format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.replica_queries), 2)
+        # pinned to the primary for ATS_READ_YOUR_WRITES_SECONDS
+        response = self.client.post(reverse("get_candidate_bulk"), payload, format="json")
+        self.assertEqual(response.json()["results"][str(self.candidate.id)]["status"], "REJECTED")
+        self.assertEqual(len(self.replica_queries), 2)
+
+    def test_replica_reads_do_not_fill_the_response_cache(self):
+        url = reverse("get_candidate", args=[self.candidate.id])
+        self.client.put(reverse("update_candidate"), {"id": self.candidate.id, "status": "Rejected"}, format="json")
+
+        other = APIClient()
+        other_user = User.objects.create_user(username="reviewer", password="secret")
+        other.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(other_user)}")
+        replica_queries = len(self.replica_queries)
+        self.assertEqual(other.get(url).json()[0]["status"], "REJECTED")
+        self.assertGreater(len(self.replica_queries), replica_queries)
+
+        # the writer reads its own write from the primary, not an entry loaded from the replica
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.assertEqual(self.client.get(url).json()[0]["status"], "REJECTED")
+        self.assertEqual(len(queries), 1)
+        # which fills the cache for everyone
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.assertEqual(other.get(url).json()[0]["status"], "REJECTED")
+        self.assertEqual(len(queries), 0)
+
+    def test_router(self):
+        router = ReadReplicaRouter()
+        replica_reads.set(True)
+        pinned_to_primary.set(False)
+        self.assertEqual(router.db_for_read(Candidate), "replica")
+        router.db_for_write(Candidate)
+        self.assertIsNone(router.db_for_read(Candidate))
+        self.assertFalse(router.allow_migrate("replica", "ats"))
+        replica_reads.set(False)
+
+
+class BenchmarkComparisonTests(TestCase):
+    def test_regressions(self):
+        from .management.commands.run_benchmarks import compare_reports
+        result = {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "throughput_rps": 500.0, "queries_per_request": 1}
+        baseline = {"scenarios": {"get": result, "search": result}}
+        current = {"scenarios": {
+            "get": dict(result, p95_ms=2.2),
+            "search": dict(result, p99_ms=6.0, throughput_rps=300.0, queries_per_request=2),
+            "export": result,
+        }}
+        comparison = compare_reports(baseline, current, threshold=0.25)
+        self.assertEqual(comparison["regressions"], [
+            "search.p99_ms: 3.0 -> 6.0", "search.throughput_rps: 500.0 -> 300.0", "search.queries_per_request: 1 -> 2",
+        ])
+        self.assertEqual(comparison["changes"]["get"]["p95_ms"]["change"], 0.1)
+        self.assertNotIn("export", comparison["changes"])
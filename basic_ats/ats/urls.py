@@ -1,11 +1,30 @@
 from django.urls import path,include
-from .views import SearchCandidate, SearchByName, CreateCandidateApi
+from django.views.decorators.csrf import csrf_exempt
+from .views import SearchCandidate, SearchByName, CreateCandidateApi, CreateCandidateBulkApi, CacheStatsApi
+from .views import CandidateMultiGetApi, CandidateStatusBulkApi, CandidateStatsApi, BackgroundJobApi, ExportCandidate, metrics
+from .async_views import AsyncCreateCandidateApi, AsyncSearchCandidate, AsyncSearchByName
 
 
 urlpatterns = [
     path("create/candidate", CreateCandidateApi.as_view(), name="create_candidate"),
+    path("create/candidate/bulk", CreateCandidateBulkApi.as_view(), name="create_candidate_bulk"),
     path("get/candidate/<int:pk>", CreateCandidateApi.as_view(), name="get_candidate"),
+    path("get/candidate/bulk", CandidateMultiGetApi.as_view(), name="get_candidate_bulk"),
     path("update/candidate", CreateCandidateApi.as_view(), name="update_candidate"),
+    path("update/candidate/bulk", CandidateStatusBulkApi.as_view(), name="update_candidate_bulk"),
     path("search/candidate", SearchCandidate.as_view(), name="search_candidate"),
     path("search/candidate/by_name", SearchByName.as_view(), name="search_by_name"),
-]
\ No newline at end of file
+    path("export/candidate", ExportCandidate.as_view(), name="export_candidate"),
+    path("search/candidate/stats", CandidateStatsApi.as_view(), name="search_candidate_stats"),
+    path("cache/stats", CacheStatsApi.as_view(), name="cache_stats"),
+    path("metrics", metrics, name="metrics"),
+    path("jobs", BackgroundJobApi.as_view(), name="create_job"),
+    path("jobs/<int:pk>", BackgroundJobApi.as_view(), name="get_job"),
+
+    # async-native versions of the views above, for ASGI deployments
+    path("async/create/candidate", csrf_exempt(AsyncCreateCandidateApi.as_view()), name="async_create_candidate"),
+    path("async/get/candidate/<int:pk>", csrf_exempt(AsyncCreateCandidateApi.as_view()), name="async_get_candidate"),
+    path("async/update/candidate", csrf_exempt(AsyncCreateCandidateApi.as_view()), name="async_update_candidate"),
+    path("async/search/candidate", csrf_exempt(AsyncSearchCandidate.as_view()), name="async_search_candidate"),
+    path("async/search/candidate/by_name", csrf_exempt(AsyncSearchByName.as_view()), name="async_search_by_name"),
+]
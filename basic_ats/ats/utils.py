@@ -1,7 +1,97 @@
 import re
-import jsonschema
-from jsonschema import validate
-from .models import Gender, JobStatus
+import json
+import base64
+from jsonschema import Draft7Validator
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+from .instrumentation import timed
+from .models import Candidate, Gender, JobStatus
+
+
+# response key -> ORM lookup, in response order
+CANDIDATE_RESPONSE_FIELDS = (
+    ("name", "name"),
+    ("age", "age"),
+    ("gender", "gender"),
+    ("phone_number", "phone_number"),
+    ("email", "email"),
+    ("years_of_exp", "years_of_exp"),
+    ("current_salary", "current_salary"),
+    ("expected_salary", "expected_salary"),
+    ("status", "status"),
+    ("reason", "reason"),
+)
+CANDIDATE_RESPONSE_KEYS = tuple(key for key, _ in CANDIDATE_RESPONSE_FIELDS)
+CANDIDATE_RESPONSE_LOOKUPS = tuple(lookup for _, lookup in CANDIDATE_RESPONSE_FIELDS)
+CANDIDATE_RESPONSE_LOOKUP_BY_KEY = dict(CANDIDATE_RESPONSE_FIELDS)
+
+# search order_by option -> column, prefix with "-" for descending
+SEARCH_ORDER_FIELDS = {
+    "salary": "expected_salary",
+    "expected_salary": "expected_salary",
+    "current_salary": "current_salary",
+    "experience": "years_of_exp",
+    "years_of_exp": "years_of_exp",
+    "age": "age",
+    "created_at": "created_at",
+}
+
+
+CREATE_CANDIDATE_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "User Information",
+    "type": "object",
+    "properties": {
+        "years_of_exp": {
+            "type": "number",
+            "minimum": 0
+        },
+        "current_salary": {
+            "type": "number",
+            "minimum": 0
+        },
+        "expected_salary": {
+            "type": "number",
+            "minimum": 0
+        },
+        "name": {
+            "type": "string",
+            "minLength": 1
+        },
+        "age": {
+            "type": "integer",
+            "minimum": 0
+        },
+        "gender": {
+            "type": "string",
+            "enum": ["Male", "Female", "Other"]
+        },
+        "phone_number": {
+            "type": "number",
+            "pattern": "^\\d{10}$"
+        },
+        "email": {
+            "type": "string",
+            "format": "email"
+        },
+        "status": {
+            "type": "string"
+        }
+    },
+    "required": ["years_of_exp", "current_salary", "expected_salary", "name", "age", "gender", "phone_number", "email"],
+    "additionalProperties": False
+}
+
+# build the validator and patterns once, not per request
+Draft7Validator.check_schema(CREATE_CANDIDATE_SCHEMA)
+CREATE_CANDIDATE_VALIDATOR = Draft7Validator(CREATE_CANDIDATE_SCHEMA)
+
+PHONE_NUMBER_PATTERN = re.compile(r'^\d{10}$')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
 
 
 def verify_gender(gender: str) -> str:
@@ -16,10 +106,11 @@ def verify_gender(gender: str) -> str:
         gender = Gender.MALE
     elif gender.upper() == Gender.FEMALE:
         gender = Gender.FEMALE
-    elif gender.upper() == Gender.OTHERS:
+    elif gender.upper() in (Gender.OTHERS, "OTHER"):
+        # the create schema takes "Other"
         gender = Gender.OTHERS
     else:
-        raise ValueError("Gender is not correct. Add from choices ['Male', 'Female', 'Others']")
+        raise ValueError("Gender is not correct. Add from choices ['Male', 'Female', 'Other']")
 
     return gender
 
@@ -52,8 +143,7 @@ def verify_phone_number(phone_number: int) -> int:
         Returns:
             phone_number: updated phone number
     """
-    pattern = r'^\d{10}$'
-    if re.match(pattern, str(phone_number)):
+    if PHONE_NUMBER_PATTERN.match(str(phone_number)):
         return phone_number
     raise ValueError(f"{phone_number} is an invalid phone number.")
 
@@ -66,99 +156,435 @@ def verify_email_address(email: str) -> str:
         Returns:
             email: updated email
     """
-    pattern = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-    if re.match(pattern, email):
+    if EMAIL_PATTERN.match(email):
         return email
     raise ValueError(f"{email} is an invalid email.")
 
 
+@timed("validation")
 def validate_ceate_candidate_request_body(data: dict) -> (bool, str):
     """
-        This function validates data required for creation of candidate
+        This function validates data required for creation of candidate.
+        All schema errors are collected in one pass and joined with "; ".
         Args:
             data: dict containing all details
         Return:
             status: True if validation is successfull
             error: error if occured
     """
-    schema = {
-        "$schema": "http://json-schema.org/draft-07/schema#",
-        "title": "User Information",
-        "type": "object",
-        "properties": {
-            "years_of_exp": {
-                "type": "number",
-                "minimum": 0
-            },
-            "current_salary": {
-                "type": "number",
-                "minimum": 0
-            },
-            "expected_salary": {
-                "type": "number",
-                "minimum": 0
-            },
-            "name": {
-                "type": "string",
-                "minLength": 1
-            },
-            "age": {
-                "type": "integer",
-                "minimum": 0
-            },
-            "gender": {
-                "type": "string",
-                "enum": ["Male", "Female", "Other"]
-            },
-            "phone_number": {
-                "type": "number",
-                "pattern": "^\\d{10}$"
-            },
-            "email": {
-                "type": "string",
-                "format": "email"
-            },
-            "status": {
-                "type": "string"
-            }
-        },
-        "required": ["years_of_exp", "current_salary", "expected_salary", "name", "age", "gender", "phone_number", "email"],
-        "additionalProperties": False
+    errors = sorted(CREATE_CANDIDATE_VALIDATOR.iter_errors(data), key=lambda err: list(err.path))
+    if errors:
+        return False, "; ".join(err.message for err in errors)
+    return True, ""
+
+
+@timed("serialization")
+def prepare_candidate_response_json(candidates) -> list:
+    """
+        This function creates dict response
+        Args:
+            candidates: Candidate queryset
+        Returns:
+            candidates_response: list of dict
+    """
+    return [candidate_row_to_json(row) for row in candidate_values(candidates)]
+
+
+def candidate_values(candidates, *extra_lookups, fields=CANDIDATE_RESPONSE_KEYS):
+    """
+        This function narrows a candidate queryset to the response columns,
+        so rows are fetched in a single query whatever the size of the result.
+        Args:
+            candidates: Candidate queryset
+            extra_lookups: lookups appended after the response columns
+            fields: response keys to select, see get_search_fields
+        Returns:
+            queryset of tuples
+    """
+    lookups = [CANDIDATE_RESPONSE_LOOKUP_BY_KEY[key] for key in fields]
+    return candidates.values_list(*lookups, *extra_lookups)
+
+
+def candidate_row_to_json(row, fields=CANDIDATE_RESPONSE_KEYS) -> dict:
+    """
+        This function maps a row from candidate_values to the response dict.
+        Any extra lookups at the end of the row are ignored.
+        Args:
+            row: tuple of candidate values
+            fields: response keys the row was selected with
+        Returns:
+            a_candidate_json: dict
+    """
+    return dict(zip(fields, row))
+
+
+def build_candidate_search_filters(data: dict) -> dict:
+    """
+        This function builds queryset filters from a search request body
+        Args:
+            data: dict containing search criteria
+        Returns:
+            filters: dict of ORM lookups
+    """
+    expected_salary_min = data.get("expected_salary_min")
+    expected_salary_max = data.get("expected_salary_max")
+    age_min = data.get("age_min")
+    age_max = data.get("age_max")
+    years_of_exp_min = data.get("years_of_exp_min")
+    phone_number = data.get("phone_number")
+    email = data.get("email")
+    name = data.get("name")
+
+    filters = {}
+    if expected_salary_min and expected_salary_max:
+        filters['expected_salary__range'] = (expected_salary_min, expected_salary_max)
+    if age_min and age_max:
+        filters['age__range'] = (age_min, age_max)
+    if years_of_exp_min:
+        filters['years_of_exp__gte'] = years_of_exp_min
+    if phone_number:
+        filters['phone_number'] = phone_number
+    if email:
+        filters['email'] = email
+    if name:
+        filters['name__icontains'] = name
+
+    return filters
+
+
+def get_search_fields(fields) -> tuple:
+    """
+        This function verifies the fields projection of a search request
+        Args:
+            fields: list of response keys, None for all of them
+        Returns:
+            fields: tuple of response keys in request order
+    """
+    if fields is None:
+        return CANDIDATE_RESPONSE_KEYS
+    if not isinstance(fields, list) or not fields:
+        raise ValueError("fields must be a non-empty list.")
+    for key in fields:
+        if key not in CANDIDATE_RESPONSE_LOOKUP_BY_KEY:
+            raise ValueError(f"{key} is an invalid field. Add from choices {list(CANDIDATE_RESPONSE_KEYS)}")
+    return tuple(dict.fromkeys(fields))
+
+
+def get_search_ordering(order_by) -> tuple:
+    """
+        This function verifies the order_by option of a search request
+        Args:
+            order_by: a key of SEARCH_ORDER_FIELDS or a list of them, "-" prefixed for descending
+        Returns:
+            ordering: tuple of ORM order_by expressions ending with id, empty when not requested
+    """
+    if order_by is None:
+        return ()
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    if not isinstance(order_by, list) or not order_by:
+        raise ValueError("order_by must be a field name or a non-empty list of field names.")
+    ordering = []
+    for key in order_by:
+        if not isinstance(key, str) or key.lstrip("-") not in SEARCH_ORDER_FIELDS:
+            raise ValueError(f"{key} is an invalid order_by. Add from choices {list(SEARCH_ORDER_FIELDS)}")
+        ordering.append(("-" if key.startswith("-") else "") + SEARCH_ORDER_FIELDS[key.lstrip("-")])
+    # id breaks ties so that equal values come back in a stable order, in the direction of the
+    # last key so that an index on a single column can still be walked instead of sorting
+    return (*ordering, "-id" if ordering[-1].startswith("-") else "id")
+
+
+def get_search_limit(limit):
+    """
+        This function verifies the top-N limit of a search request
+        Args:
+            limit: number of rows, None for no limit
+        Returns:
+            limit: int or None
+    """
+    if limit is None:
+        return None
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise ValueError(f"{limit} is an invalid limit.")
+    return limit
+
+
+def build_candidate_search_options(data: dict) -> dict:
+    """
+        This function reads the fields, order_by and limit options of a search request.
+        Cursor pagination is always ordered by created_at, so it only takes fields.
+        Args:
+            data: dict containing search options
+        Returns:
+            options: dict of fields, ordering and limit
+    """
+    options = {
+        "fields": get_search_fields(data.get("fields")),
+        "ordering": get_search_ordering(data.get("order_by")),
+        "limit": get_search_limit(data.get("limit")),
     }
+    paginated = data.get("paginate") or data.get("cursor") or data.get("page_size")
+    if paginated and (options["ordering"] or options["limit"]):
+        raise ValueError("order_by and limit cannot be combined with cursor pagination.")
+    return options
+
+
+def search_candidate_values(candidates, fields=CANDIDATE_RESPONSE_KEYS, ordering=(), limit=None):
+    """
+        This function builds the query of a search: projected columns, ORDER BY and LIMIT
+        are all applied in SQL
+        Args:
+            candidates: filtered Candidate queryset
+            fields: response keys to select
+            ordering: ORM order_by expressions
+            limit: number of rows, None for all
+        Returns:
+            queryset of tuples
+    """
+    if ordering:
+        candidates = candidates.order_by(*ordering)
+    rows = candidate_values(candidates, fields=fields)
+    return rows if limit is None else rows[:limit]
+
+
+def encode_search_cursor(created_at, candidate_id) -> str:
+    """
+        This function encodes the keyset position of the last returned row
+        Args:
+            created_at: created_at of the last row
+            candidate_id: id of the last row
+        Returns:
+            cursor: opaque url-safe string
+    """
+    raw = f"{created_at.isoformat()}|{candidate_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
 
-    # Validate the data
-    status = True
-    error = ""
+def decode_search_cursor(cursor: str) -> tuple:
+    """
+        This function decodes a cursor created by encode_search_cursor
+        Args:
+            cursor: opaque cursor string
+        Returns:
+            (created_at, candidate_id)
+    """
     try:
-        validate(instance=data, schema=schema)
-    except jsonschema.exceptions.ValidationError as err:
-        error = err.message
-        status = False
+        created_at, candidate_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        created_at = parse_datetime(created_at)
+        candidate_id = int(candidate_id)
+    except (ValueError, UnicodeDecodeError):
+        created_at = None
+    if created_at is None:
+        raise ValueError(f"{cursor} is an invalid cursor.")
+    return created_at, candidate_id
 
-    return status, error
 
+def get_search_page_size(page_size) -> int:
+    """
+        This function verifies the requested page size
+        Args:
+            page_size: requested page size, None for the default
+        Returns:
+            page_size: page size capped at ATS_SEARCH_MAX_PAGE_SIZE
+    """
+    if page_size is None:
+        return settings.ATS_SEARCH_PAGE_SIZE
+    if isinstance(page_size, bool) or not isinstance(page_size, int) or page_size < 1:
+        raise ValueError(f"{page_size} is an invalid page size.")
+    return min(page_size, settings.ATS_SEARCH_MAX_PAGE_SIZE)
 
-def prepare_candidate_response_json(candidates) -> list:
+
+def candidate_page_values(candidates, cursor=None, page_size=None, fields=CANDIDATE_RESPONSE_KEYS) -> tuple:
     """
-        This function creates dict response
+        This function builds the query for one keyset page, ordered by (created_at, id).
+        One extra row is fetched to tell whether another page exists.
         Args:
-            candidates: list of Candidate objects
+            candidates: filtered Candidate queryset
+            cursor: cursor returned with the previous page
+            page_size: number of rows per page
+            fields: response keys to select
         Returns:
-            candidates_response: list of dict
+            (queryset of value tuples ending with created_at and id, page_size)
     """
-    candidates_response = []
-    for a_candidate in candidates:
-        a_candidate_json = {
-            "name": a_candidate.name,
-            "age": a_candidate.age,
-            "gender": a_candidate.gender,
-            "phone_number": a_candidate.phone_number,
-            "email": a_candidate.email,
-            "years_of_exp": a_candidate.experience.years_of_exp,
-            "current_salary": a_candidate.experience.current_salary,
-            "expected_salary": a_candidate.experience.expected_salary,
-            "status": a_candidate.status,
-            "reason": a_candidate.reason,
-        }
-        candidates_response.append(a_candidate_json)
-    return candidates_response
+    page_size = get_search_page_size(page_size)
+    if cursor:
+        created_at, candidate_id = decode_search_cursor(cursor)
+        candidates = candidates.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=candidate_id)
+        )
+    candidates = candidates.order_by("created_at", "id")
+    return candidate_values(candidates, "created_at", "id", fields=fields)[:page_size + 1], page_size
+
+
+@timed("serialization")
+def build_candidate_page(rows: list, page_size: int, fields=CANDIDATE_RESPONSE_KEYS) -> dict:
+    """
+        This function turns the rows of candidate_page_values into a page response
+        Args:
+            rows: fetched rows
+            page_size: number of rows per page
+            fields: response keys the rows were selected with
+        Returns:
+            page: dict with results and next_cursor
+    """
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_search_cursor(*rows[-1][-2:])
+
+    return {
+        "results": [candidate_row_to_json(row, fields) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+def paginate_candidates(candidates, cursor=None, page_size=None, fields=CANDIDATE_RESPONSE_KEYS) -> dict:
+    """
+        This function returns one keyset page of candidates ordered by (created_at, id)
+        Args:
+            candidates: filtered Candidate queryset
+            cursor: cursor returned with the previous page
+            page_size: number of rows per page
+            fields: response keys to select
+        Returns:
+            page: dict with results and next_cursor
+    """
+    rows, page_size = candidate_page_values(candidates, cursor, page_size, fields)
+    return build_candidate_page(list(rows), page_size, fields)
+
+
+@timed("serialization")
+def stream_candidates_ndjson(candidates, chunk_size=None, fields=CANDIDATE_RESPONSE_KEYS, ordering=(), limit=None):
+    """
+        This function yields candidates as newline delimited JSON.
+        Rows are pulled from the database in chunks so memory stays flat.
+        Args:
+            candidates: filtered Candidate queryset
+            chunk_size: rows fetched per database round trip
+            fields, ordering, limit: see search_candidate_values
+        Returns:
+            generator of str lines
+    """
+    chunk_size = chunk_size or settings.ATS_SEARCH_STREAM_CHUNK_SIZE
+    for row in search_candidate_values(candidates, fields, ordering, limit).iterator(chunk_size=chunk_size):
+        yield json.dumps(candidate_row_to_json(row, fields), cls=JSONEncoder) + "\n"
+
+
+@timed("serialization")
+def fetch_candidate_rows(candidate_ids, fields=CANDIDATE_RESPONSE_KEYS) -> dict:
+    """
+        This function fetches response rows for a list of ids in chunked queries
+        Args:
+            candidate_ids: list of candidate ids
+            fields: response keys to select
+        Returns:
+            rows: dict of id -> candidate response dict
+    """
+    candidate_ids = list(candidate_ids)
+    chunk_size = settings.ATS_ID_CHUNK_SIZE
+    rows = {}
+    for start in range(0, len(candidate_ids), chunk_size):
+        chunk = candidate_ids[start:start + chunk_size]
+        for row in candidate_values(Candidate.objects.filter(id__in=chunk), "id", fields=fields):
+            rows[row[-1]] = candidate_row_to_json(row, fields)
+    return rows
+
+
+def verify_candidate_ids(candidate_ids: list) -> list:
+    """
+        This function verifies candidate ids from a request body, JSON booleans and strings are refused
+        Args:
+            candidate_ids: list of candidate ids
+        Returns:
+            candidate_ids: ids without repeats, in request order
+    """
+    if any(isinstance(candidate_id, bool) or not isinstance(candidate_id, int) for candidate_id in candidate_ids):
+        raise TypeError("ids must be integers")
+    return list(dict.fromkeys(candidate_ids))
+
+
+def get_candidates_by_ids(candidate_ids: list, fields=CANDIDATE_RESPONSE_KEYS) -> dict:
+    """
+        This function looks up many candidates at once, one query per ATS_ID_CHUNK_SIZE ids
+        Args:
+            candidate_ids: list of candidate ids, at most ATS_MULTI_GET_MAX_IDS
+            fields: response keys to select
+        Returns:
+            result: dict with results keyed by id in request order (None when not found) and not_found ids
+    """
+    if not isinstance(candidate_ids, list) or not candidate_ids:
+        raise TypeError("ids must be a non-empty list of candidate ids")
+    if len(candidate_ids) > settings.ATS_MULTI_GET_MAX_IDS:
+        raise ValueError(f"At most {settings.ATS_MULTI_GET_MAX_IDS} ids can be fetched at once.")
+    candidate_ids = verify_candidate_ids(candidate_ids)
+    rows = fetch_candidate_rows(candidate_ids, fields)
+    return {
+        "results": {candidate_id: rows.get(candidate_id) for candidate_id in candidate_ids},
+        "not_found": [candidate_id for candidate_id in candidate_ids if candidate_id not in rows],
+    }
+
+
+def transition_candidates_status(candidate_ids: list, job_status: str, reason: str = "") -> dict:
+    """
+        This function moves APPLIED candidates to a new status.
+        Each chunk of ids is changed by one conditional UPDATE, so a candidate already
+        moved by a concurrent reviewer is never overwritten.
+        Args:
+            candidate_ids: list of candidate ids
+            job_status: new job status
+            reason: reason stored with the new status
+        Returns:
+            result: dict with transitioned ids, already final {id: status} and not found ids
+    """
+    job_status = verify_job_status(job_status)
+    if len(candidate_ids) > settings.ATS_STATUS_TRANSITION_MAX_IDS:
+        raise ValueError(f"At most {settings.ATS_STATUS_TRANSITION_MAX_IDS} ids can be updated at once.")
+    candidate_ids = verify_candidate_ids(candidate_ids)
+    chunk_size = settings.ATS_ID_CHUNK_SIZE
+    chunks = [candidate_ids[start:start + chunk_size] for start in range(0, len(candidate_ids), chunk_size)]
+
+    # rows changed by this call are recognised by their updated_at stamp
+    stamp = timezone.now()
+    transitioned = set()
+    current = {}
+    with transaction.atomic():
+        for chunk in chunks:
+            Candidate.objects.filter(id__in=chunk, status=JobStatus.APPLIED).update(
+                status=job_status, reason=reason, updated_at=stamp
+            )
+        for chunk in chunks:
+            for candidate_id, candidate_status, updated_at in Candidate.objects.filter(id__in=chunk).values_list(
+                    "id", "status", "updated_at"):
+                if updated_at == stamp and candidate_status == job_status:
+                    transitioned.add(candidate_id)
+                else:
+                    current[candidate_id] = candidate_status
+
+    return {
+        "status": job_status,
+        "transitioned": [candidate_id for candidate_id in candidate_ids if candidate_id in transitioned],
+        "already_final": current,
+        "not_found": [candidate_id for candidate_id in candidate_ids
+                      if candidate_id not in transitioned and candidate_id not in current],
+    }
+
+
+def get_client_ip(request):
+    """
+        This function returns the address of the client behind any ATS_TRUSTED_PROXIES.
+        A request from a trusted proxy is attributed to the right-most X-Forwarded-For address
+        that is not a trusted proxy itself; without the header the client is unknown.
+        Args:
+            request: HttpRequest
+        Returns:
+            ip: client address, or None when a trusted proxy did not forward it
+    """
+    ip = request.META.get("REMOTE_ADDR")
+    if ip not in settings.ATS_TRUSTED_PROXIES:
+        return ip
+    forwarded = [address.strip() for address in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+                 if address.strip()]
+    for address in reversed(forwarded):
+        if address not in settings.ATS_TRUSTED_PROXIES:
+            return address
+    return None
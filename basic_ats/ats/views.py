@@ -2,17 +2,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.db.models import Case, When, Value, IntegerField, F, Sum, Count
-from django.db.models.functions import Lower
-from .models import Candidate, Experience, JobStatus
-from .utils import verify_gender, verify_phone_number, verify_email_address, validate_ceate_candidate_request_body, prepare_candidate_response_json, verify_job_status
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from .models import BackgroundJob, Candidate
+from .utils import verify_gender, verify_phone_number, verify_email_address, validate_ceate_candidate_request_body
+from .utils import build_candidate_search_filters, paginate_candidates, stream_candidates_ndjson, transition_candidates_status, candidate_values
+from .utils import CANDIDATE_RESPONSE_KEYS, build_candidate_search_options, search_candidate_values, get_candidates_by_ids, get_search_fields
+from .utils import get_client_ip
+from .name_index import search_candidates_by_name, fuzzy_search_candidates_by_name
+from .importer import import_candidates, read_candidate_body
+from .stats import candidate_facets, candidate_stats, get_facet_buckets
+from .snapshot import snapshot_candidate_rows
+from .renderers import RenderedJSON, attach_facets, dumps, render_candidate_rows
+from .cache import cache_stats, get_cached_candidate, get_cached_search, invalidate_candidates
+from .instrumentation import registry
+from .authentication import CachedJWTAuthentication
+from .jobs import enqueue_job, job_response_json
+from .export import EXPORT_CONTENT_TYPES, GZIP_CONTENT_TYPE, export_candidates, export_filename, get_export_format
+from .dedup import DuplicateCandidate, create_candidate_deduplicated, creation_response, get_dedup_policy
 from . import constants
-from collections import defaultdict
 
 
 class CreateCandidateApi(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     """
         Create, get and update candidate
@@ -22,7 +34,7 @@ class CreateCandidateApi(APIView):
 
         try:
             candidates = Candidate.objects.filter(id=pk)
-            res = prepare_candidate_response_json(candidates)
+            res = get_cached_candidate(pk, lambda: render_candidate_rows(candidate_values(candidates)))
             response_status = status.HTTP_200_OK
         except Exception as e:
             res = {
@@ -43,20 +55,25 @@ class CreateCandidateApi(APIView):
                 gender = verify_gender(data["gender"])
                 phone_number = verify_phone_number(data["phone_number"])
                 email = verify_email_address(data["email"])
-                experience_obj = Experience.objects.create(years_of_exp=data["years_of_exp"], current_salary=data["current_salary"],
-                                        expected_salary=data["expected_salary"])
-                candidate = Candidate.objects.create(name=data["name"], age=data["age"], gender=gender, phone_number=phone_number,
-                                        email=email, experience=experience_obj)
-                res = {
-                    "id": candidate.id,
-                    "message": constants.SUCCESSFUL_CREATION
-                }
+                policy = get_dedup_policy(request.query_params.get("dedup_policy"))
+                candidate_id, created = create_candidate_deduplicated(dict(
+                    name=data["name"], age=data["age"], gender=gender, phone_number=phone_number, email=email,
+                    years_of_exp=data["years_of_exp"], current_salary=data["current_salary"],
+                    expected_salary=data["expected_salary"]), policy)
+                res = creation_response(candidate_id, created, policy)
                 response_status = status.HTTP_200_OK
             else:
                 res = {
                     "error": error,
                     "message": constants.INCORRECT_PAYLOAD
                 }
+        except DuplicateCandidate as e:
+            res = {
+                "error": str(e),
+                "id": e.candidate_id,
+                "message": constants.DUPLICATE_CANDIDATE_REJECTED
+            }
+            response_status = status.HTTP_409_CONFLICT
         except KeyError as e:
             res = {
                 "error": str(e),
@@ -81,27 +98,22 @@ class CreateCandidateApi(APIView):
         try:
             data = request.data
             current_status = data["status"]
-            candidates = Candidate.objects.filter(id=data["id"])
-            if candidates:
-                candidates = candidates[0]
-                if candidates.status == JobStatus.APPLIED:
-                    current_status = verify_job_status(current_status)
-                    candidates.status = current_status
-                    candidates.reason = data.get("reason", "")
-                    candidates.save()
-                    res = {
-                        "id": data["id"],
-                        "status": current_status,
-                        "message": constants.STATUS_UPDATION_SUCCESSFUL
-                    }
-                    response_status = status.HTTP_200_OK
-                else:
-                    res = {
-                        "id": data["id"],
-                        "status": current_status,
-                        "error": f"Status cannot be updated. Candidate is already {candidates.status}",
-                        "message": constants.STATUS_UPDATION_FAILURE
-                    }
+            result = transition_candidates_status([data["id"]], current_status, data.get("reason", ""))
+            if result["transitioned"]:
+                invalidate_candidates(result["transitioned"])
+                res = {
+                    "id": data["id"],
+                    "status": result["status"],
+                    "message": constants.STATUS_UPDATION_SUCCESSFUL
+                }
+                response_status = status.HTTP_200_OK
+            elif result["already_final"]:
+                res = {
+                    "id": data["id"],
+                    "status": current_status,
+                    "error": f"Status cannot be updated. Candidate is already {result['already_final'][data['id']]}",
+                    "message": constants.STATUS_UPDATION_FAILURE
+                }
             else:
                 res = {
                     "id": data["id"],
@@ -118,8 +130,104 @@ class CreateCandidateApi(APIView):
         return Response(res, status=response_status)
 
 
+class CandidateMultiGetApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Get many candidates by id in one request
+    """
+    def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            data = request.data
+            res = get_candidates_by_ids(data["ids"], get_search_fields(data.get("fields")))
+            response_status = status.HTTP_200_OK
+        except KeyError as e:
+            res = {
+                "error": str(e),
+                "message": constants.MISSING_KEYS_ERROR
+            }
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.INCORRECT_PAYLOAD
+            }
+
+        return Response(res, status=response_status)
+
+
+class CandidateStatusBulkApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Update the status of many APPLIED candidates at once
+    """
+    def put(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            data = request.data
+            if not isinstance(data["ids"], list):
+                raise TypeError("ids must be a list of candidate ids")
+            res = transition_candidates_status(data["ids"], data["status"], data.get("reason", ""))
+            invalidate_candidates(res["transitioned"])
+            res["message"] = constants.STATUS_UPDATION_SUCCESSFUL
+            response_status = status.HTTP_200_OK
+        except KeyError as e:
+            res = {
+                "error": str(e),
+                "message": constants.MISSING_KEYS_ERROR
+            }
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.STATUS_UPDATION_FAILURE
+            }
+
+        return Response(res, status=response_status)
+
+
+class CreateCandidateBulkApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Create candidates in bulk from a JSON array, NDJSON or CSV body
+    """
+    def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+
+        try:
+            policy = get_dedup_policy(request.query_params.get("dedup_policy"))
+            if request.content_type.startswith("application/json"):
+                rows = request.data
+                if not isinstance(rows, list):
+                    raise ValueError("Expected a JSON array of candidates.")
+                payload = {"rows": rows, "dedup_policy": policy}
+            else:
+                rows = read_candidate_body(request.body, request.content_type)
+                payload = {"body": request.body.decode(), "content_type": request.content_type, "dedup_policy": policy}
+            if request.query_params.get("background") == "true":
+                # run_worker imports the rows, poll jobs/<id> for progress and the import result
+                job = enqueue_job("import_candidates", payload)
+                res = {"id": job.id, "state": job.state, "message": constants.JOB_QUEUED}
+                return Response(res, status=status.HTTP_202_ACCEPTED)
+            res = import_candidates(rows, policy=policy)
+            if res["created"] or res["merged"]:
+                invalidate_candidates([row["id"] for row in res["duplicates"]] if res["merged"] else ())
+            res["message"] = constants.BULK_IMPORT_COMPLETED
+            response_status = status.HTTP_200_OK
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.INCORRECT_PAYLOAD
+            }
+
+        return Response(res, status=response_status)
+
+
 class SearchCandidate(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     """
         Search candidate by its details
@@ -129,32 +237,101 @@ class SearchCandidate(APIView):
         try:
             data = request.data
 
-            expected_salary_min = data.get("expected_salary_min")
-            expected_salary_max = data.get("expected_salary_max")
-            age_min = data.get("age_min")
-            age_max = data.get("age_max")
-            years_of_exp_min = data.get("years_of_exp_min")
-            phone_number = data.get("phone_number")
-            email = data.get("email")
-            name = data.get("name")
-
-            filters = {}
-            if expected_salary_min and expected_salary_max:
-                filters['experience__expected_salary__range'] = (expected_salary_min, expected_salary_max)
-            if age_min and age_max:
-                filters['age__range'] = (age_min, age_max)
-            if years_of_exp_min:
-                filters['experience__years_of_exp__gte'] = years_of_exp_min
-            if phone_number:
-                filters['phone_number'] = phone_number
-            if email:
-                filters['email'] = email
-            if name:
-                filters['name__icontains'] = name
+            filters = build_candidate_search_filters(data)
+            options = build_candidate_search_options(data)
+            facet_buckets = get_facet_buckets(data)
+            candidates = Candidate.objects.filter(**filters)
+
+            if data.get("stream"):
+                return StreamingHttpResponse(stream_candidates_ndjson(candidates, **options),
+                                             content_type="application/x-ndjson")
+
+            page = {key: data.get(key) for key in ("paginate", "cursor", "page_size") if data.get(key)}
+            if page:
+                loader = lambda: paginate_candidates(candidates, data.get("cursor"), data.get("page_size"),
+                                                     options["fields"])
+            else:
+                # cached as encoded JSON, so cache hits skip serialization
+                def loader():
+                    projected = options["fields"] != CANDIDATE_RESPONSE_KEYS or options["ordering"] or options["limit"]
+                    rows = None if projected else snapshot_candidate_rows(filters)
+                    if rows is None:
+                        return render_candidate_rows(search_candidate_values(candidates, **options).iterator(
+                            chunk_size=settings.ATS_SEARCH_STREAM_CHUNK_SIZE), options["fields"])
+                    return RenderedJSON(dumps(rows))
+            if facet_buckets is not None:
+                results_loader = loader
+                loader = lambda: attach_facets(results_loader(), candidate_facets(candidates, **facet_buckets))
+            res = get_cached_search({"filters": filters, "page": page, "options": options, "facets": facet_buckets},
+                                    loader)
+            response_status = status.HTTP_200_OK
+
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+        return Response(res, status=response_status)
+
+
+class ExportCandidate(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Stream the candidates matching a search as CSV or NDJSON, optionally gzipped
+    """
+    def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+        try:
+            data = request.data
+
+            filters = build_candidate_search_filters(data)
+            options = build_candidate_search_options(data)
+            export_format = get_export_format(data.get("format"))
+            gzip = bool(data.get("gzip"))
+            if request.query_params.get("background") == "true":
+                job = enqueue_job("export_candidates", {"search": data})
+                res = {"id": job.id, "state": job.state, "message": constants.JOB_QUEUED}
+                return Response(res, status=status.HTTP_202_ACCEPTED)
+
+            candidates = Candidate.objects.filter(**filters)
+            response = StreamingHttpResponse(export_candidates(candidates, export_format, gzip, **options),
+                                             content_type=GZIP_CONTENT_TYPE if gzip else EXPORT_CONTENT_TYPES[export_format])
+            response["Content-Disposition"] = f'attachment; filename="{export_filename(export_format, gzip)}"'
+            return response
+
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
+        return Response(res, status=response_status)
+
+
+class CandidateStatsApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Aggregated statistics over the candidates matching a search
+    """
+    def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
+        try:
+            data = request.data
 
+            filters = build_candidate_search_filters(data)
             candidates = Candidate.objects.filter(**filters)
+            buckets = {
+                "age_bucket": data.get("age_bucket", settings.ATS_STATS_AGE_BUCKET),
+                "years_of_exp_bucket": data.get("years_of_exp_bucket", settings.ATS_STATS_YEARS_OF_EXP_BUCKET),
+            }
 
-            res = prepare_candidate_response_json(candidates)
+            loader = lambda: candidate_stats(candidates, **buckets)
+            if settings.ATS_STATS_CACHE_TIMEOUT:
+                res = get_cached_search({"stats": buckets, "filters": filters}, loader,
+                                        timeout=settings.ATS_STATS_CACHE_TIMEOUT)
+            else:
+                res = loader()
             response_status = status.HTTP_200_OK
 
         except Exception as e:
@@ -166,7 +343,7 @@ class SearchCandidate(APIView):
 
 
 class SearchByName(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     """
         Search candidate by name
@@ -180,49 +357,78 @@ class SearchByName(APIView):
             if not query:
                 return Response([])
 
-            query_words = query.lower().split()
-
-            cnt = 1
-            annotate_dict = {}
-            overall_score = None
-            for word in query_words:
-                col_name = "word_" + str(cnt)
-                annotate_dict[col_name] = Case(
-                        When(name__icontains=word, then=Value(1)),
-                        default=Value(0),
-                        output_field=IntegerField()
-                    )
-                cnt = cnt+1
-                overall_score = overall_score + F(col_name) if overall_score else F(col_name)
+            if data.get("fuzzy"):
+                res = fuzzy_search_candidates_by_name(query, data.get("threshold"), data.get("top_k"))
+            else:
+                res = search_candidates_by_name(query)
+            response_status = status.HTTP_200_OK
 
-            candidates = Candidate.objects.annotate(**annotate_dict)
-            candidates = candidates.annotate(common_words_count=overall_score)
-            candidates = candidates.annotate(
-                exact_match=Case(When(name__iexact=query, then=Value(100)),
-                                 default=0,
-                                 output_field=IntegerField())
-            )
+        except Exception as e:
+            res = {
+                "error": str(e),
+                "message": constants.DEFAULT_ERROR_MESSAGE
+            }
 
-            candidates = candidates.annotate(
-                score=F('exact_match') + F('common_words_count')
-            )
+        return Response(res, status=response_status)
 
 
-            # Filter out candidates with a score of greater than 0
-            candidates = candidates.filter(score__gt=0)
+class BackgroundJobApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Queue a background job and poll its state, progress and result
+    """
+    def get(self, request, pk):
+        response_status = status.HTTP_404_NOT_FOUND
 
-            # sort candidates on descending order
-            sorted_candidates = candidates.order_by('-score')
+        try:
+            job = BackgroundJob.objects.get(id=pk)
+            res = job_response_json(job)
+            response_status = status.HTTP_200_OK
+        except BackgroundJob.DoesNotExist as e:
+            res = {
+                "error": str(e),
+                "message": constants.JOB_NOT_FOUND
+            }
 
-            sorted_candidates = list(sorted_candidates)
+        return Response(res, status=response_status)
 
-            res = prepare_candidate_response_json(sorted_candidates)
-            response_status = status.HTTP_200_OK
+    def post(self, request):
+        response_status = status.HTTP_400_BAD_REQUEST
 
+        try:
+            data = request.data
+            if not isinstance(data, dict) or not isinstance(data.get("kind"), str):
+                raise ValueError("kind is required.")
+            payload = data.get("payload", {})
+            if not isinstance(payload, dict):
+                raise ValueError("payload must be an object.")
+            job = enqueue_job(data["kind"], payload, max_attempts=data.get("max_attempts"))
+            res = {"id": job.id, "state": job.state, "message": constants.JOB_QUEUED}
+            response_status = status.HTTP_202_ACCEPTED
         except Exception as e:
             res = {
                 "error": str(e),
-                "message": constants.DEFAULT_ERROR_MESSAGE
+                "message": constants.INCORRECT_PAYLOAD
             }
 
         return Response(res, status=response_status)
+
+
+class CacheStatsApi(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    """
+        Hit and miss counters of the candidate response cache
+    """
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """
+        Request and phase metrics in Prometheus text format, served to ATS_METRICS_ALLOWED_IPS only
+    """
+    if get_client_ip(request) not in settings.ATS_METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -49,7 +49,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'ats.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'ats.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -62,6 +66,92 @@ SIMPLE_JWT = {
 }
 
 
+# Candidate search pagination and streaming
+ATS_SEARCH_PAGE_SIZE = 100
+ATS_SEARCH_MAX_PAGE_SIZE = 1000
+ATS_SEARCH_STREAM_CHUNK_SIZE = 2000
+# CSV/NDJSON export: gzip level of compressed exports and where background export jobs write their files
+ATS_EXPORT_GZIP_LEVEL = 6
+ATS_EXPORT_DIR = BASE_DIR / 'exports'
+
+# Candidates validated and inserted per transaction by bulk imports
+ATS_IMPORT_BATCH_SIZE = 500
+
+# What creates and imports do with an applicant whose email and phone number match an existing
+# candidate: 'reject', 'merge' (update the existing profile) or 'return_existing'.
+# Overridable per request with ?dedup_policy=
+ATS_DEDUP_POLICY = 'return_existing'
+
+# Max ids bound into a single id__in query
+ATS_ID_CHUNK_SIZE = 500
+
+# Fuzzy name search: minimum trigram similarity, results returned, and how many
+# candidates per result are shortlisted by similarity in SQL before exact matches are boosted
+ATS_FUZZY_THRESHOLD = 0.3
+ATS_FUZZY_TOP_K = 50
+ATS_FUZZY_SHORTLIST_FACTOR = 10
+
+# In-process columnar snapshot answering SearchCandidate range/equality filters.
+# Each process refreshes it by updated_at at most every ATS_SNAPSHOT_REFRESH_SECONDS,
+# and immediately after its own writes.
+ATS_SNAPSHOT_ENABLED = False
+ATS_SNAPSHOT_REFRESH_SECONDS = 5
+# Rows are stamped before their transaction commits, so each refresh re-reads rows stamped up to
+# this many seconds before the newest row seen. Keep it above the longest write transaction
+# (including the busy_timeout wait for the write lock).
+ATS_SNAPSHOT_REFRESH_OVERLAP_SECONDS = 60
+
+# Max ids accepted by one multi-get (get/candidate/bulk)
+ATS_MULTI_GET_MAX_IDS = 5000
+
+# Max candidates moved by one batch status transition
+ATS_STATUS_TRANSITION_MAX_IDS = 5000
+
+# Candidate response cache, any Django cache backend works.
+# Use a shared backend (memcached, redis, database) when running several processes
+# so that invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ats',
+    }
+}
+ATS_CACHE_ALIAS = 'default'
+ATS_CACHE_TIMEOUT = 300
+
+# Candidate statistics: default histogram bucket widths and result cache TTL (0 disables)
+ATS_STATS_AGE_BUCKET = 5
+ATS_STATS_YEARS_OF_EXP_BUCKET = 2
+ATS_STATS_CACHE_TIMEOUT = 30
+
+# Request metrics: paths measured by RequestMetricsMiddleware and clients allowed to scrape /ats/metrics
+ATS_METRICS_PATH_PREFIX = '/ats/'
+ATS_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Addresses of reverse proxies in front of the app. Requests from them are attributed to the client in
+# X-Forwarded-For, which the proxy must set. Behind a local proxy, list its address here, or every client
+# looks like localhost to ATS_METRICS_ALLOWED_IPS.
+ATS_TRUSTED_PROXIES = []
+# Opt-in cProfile dumps: fraction of requests profiled (0 disables) and the slowness threshold for a dump
+ATS_PROFILE_SAMPLE_RATE = 0
+ATS_PROFILE_SLOW_MS = 500
+ATS_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# CachedJWTAuthentication: verified tokens and users kept per process (0 disables), entries expire after
+# the TTL or at the token's exp, whichever comes first
+ATS_AUTH_CACHE_SIZE = 10000
+ATS_AUTH_CACHE_TTL_SECONDS = 60
+
+# Background jobs (manage.py run_worker): retries with exponential backoff capped at the max,
+# a running job whose worker stops reporting progress for the lease is requeued (failed once out of attempts)
+ATS_JOB_MAX_ATTEMPTS = 3
+ATS_JOB_RETRY_BACKOFF_SECONDS = 5
+ATS_JOB_RETRY_BACKOFF_MAX_SECONDS = 300
+ATS_JOB_LEASE_SECONDS = 300
+ATS_JOB_WORKER_POOL = 'thread'
+ATS_JOB_WORKER_CONCURRENCY = 4
+ATS_JOB_POLL_SECONDS = 1
+
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +160,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'ats.middleware.RequestMetricsMiddleware',
+    'ats.middleware.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'basic_ats.urls'
@@ -100,7 +192,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # keep connections open between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # seconds to wait for a lock before raising "database is locked"
+            'timeout': 20,
+        },
+    },
+    # local stand-in for a read replica, a copy of default made by manage.py refresh_replica
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+DATABASE_ROUTERS = ['ats.routers.ReadReplicaRouter']
+
+# Read replicas: aliases serving the reads of ATS_READ_ROUTES (url names), e.g. ['replica'].
+# Empty sends everything to default. A client that wrote reads from default for ATS_READ_YOUR_WRITES_SECONDS.
+ATS_READ_DATABASES = []
+ATS_READ_ROUTES = [
+    'get_candidate', 'get_candidate_bulk', 'search_candidate', 'search_by_name', 'search_candidate_stats',
+    'export_candidate', 'async_get_candidate', 'async_search_candidate', 'async_search_by_name',
+]
+ATS_READ_YOUR_WRITES_SECONDS = 10
+
+# Run on every new SQLite connection, see ats.db.apply_sqlite_pragmas
+ATS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY',
 }
 
 